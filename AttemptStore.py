@@ -0,0 +1,408 @@
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+from array import array
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+FIELDNAMES = ['topic', 'difficulty', 'correct', 'date']
+# csv.DictWriter terminates rows with \r\n, so the header on disk looks like this
+HEADER_LINE = (','.join(FIELDNAMES) + '\r\n').encode()
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DIFFICULTIES = ['e', 'm', 'h']
+DIFFICULTY_CODES = {difficulty: i for i, difficulty in enumerate(DIFFICULTIES)}
+# Dates are stored as naive local time, so timestamps count seconds from a naive epoch
+EPOCH = datetime(1970, 1, 1)
+# Bytes before a saved position that must be unchanged for appends after it to be replayed
+POSITION_TAIL_BYTES = 256
+
+def format_date(date):
+    """Accept either a datetime or an already formatted date string"""
+    if isinstance(date, datetime):
+        return date.strftime(DATE_FORMAT)
+    return date
+
+def date_to_timestamp(date):
+    if not isinstance(date, datetime):
+        date = datetime.fromisoformat(date)
+    return int((date - EPOCH).total_seconds())
+
+def timestamp_to_date(timestamp):
+    return (EPOCH + timedelta(seconds=timestamp)).strftime(DATE_FORMAT)
+
+def encode_outcome(difficulty, correct):
+    """Pack difficulty and correctness into one small int: difficulty index * 2 + correct"""
+    return DIFFICULTY_CODES[difficulty] * 2 + (correct is True or correct == 'True')
+
+class AttemptRow(Mapping):
+    """
+    Read-only dict-like view of one attempt, with the same string values
+    the CSV file holds, for callers that expect rows from csv.DictReader.
+    """
+    __slots__ = ('_history', '_index')
+    
+    def __init__(self, history, index):
+        self._history = history
+        self._index = index
+
+    def __getitem__(self, key):
+        history, i = self._history, self._index
+        if key == 'topic':
+            return history.topics[history.topic_ids[i]]
+        if key == 'difficulty':
+            return DIFFICULTIES[history.outcomes[i] >> 1]
+        if key == 'correct':
+            return 'True' if history.outcomes[i] & 1 else 'False'
+        if key == 'date':
+            return timestamp_to_date(history.timestamps[i])
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDNAMES)
+
+    def __len__(self):
+        return len(FIELDNAMES)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class AttemptHistory:
+    """
+    Attempts stored column by column: an interned topic id, one outcome byte
+    (see encode_outcome) and an integer timestamp per attempt, about 13 bytes
+    each instead of a dict of four strings. Indexing and iterating yield AttemptRow views.
+    """
+    def __init__(self):
+        self.topics = []            # topic id -> topic name
+        self.topic_index = {}       # topic name -> topic id
+        self.topic_ids = array('I')
+        self.outcomes = bytearray()
+        self.timestamps = array('q')
+        # Consecutive attempts usually share a date string, so remember the last one parsed
+        self._last_date = None
+        self._last_timestamp = None
+
+    def intern_topic(self, topic):
+        topic_id = self.topic_index.get(topic)
+        if topic_id is None:
+            topic_id = self.topic_index[topic] = len(self.topics)
+            self.topics.append(topic)
+        return topic_id
+
+    def append(self, topic, difficulty, correct, date):
+        """Add one attempt. Raises KeyError or ValueError for an unknown difficulty or a bad date."""
+        outcome = encode_outcome(difficulty, correct)
+        if date != self._last_date:
+            self._last_timestamp = date_to_timestamp(date)
+            self._last_date = date
+        self.topic_ids.append(self.intern_topic(topic))
+        self.outcomes.append(outcome)
+        self.timestamps.append(self._last_timestamp)
+
+    def append_from(self, other, i):
+        """Copy attempt i of another history, without decoding it"""
+        self.topic_ids.append(self.intern_topic(other.topics[other.topic_ids[i]]))
+        self.outcomes.append(other.outcomes[i])
+        self.timestamps.append(other.timestamps[i])
+
+    def extend(self, other):
+        for i in range(len(other)):
+            self.append_from(other, i)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return AttemptRow(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield AttemptRow(self, i)
+
+def keep_last_per_topic(history, keep_last):
+    """The most recent keep_last attempts of each topic, in their original order"""
+    counts = {}
+    kept = []
+    for i in range(len(history) - 1, -1, -1):
+        topic_id = history.topic_ids[i]
+        counts[topic_id] = counts.get(topic_id, 0) + 1
+        if counts[topic_id] <= keep_last:
+            kept.append(i)
+    result = AttemptHistory()
+    for i in reversed(kept):
+        result.append_from(history, i)
+    return result
+
+class CsvAttemptStore:
+    """
+    Attempt history kept in an append-only CSV file of topic, difficulty,
+    correct ('True'/'False') and date. The file is parsed once into an
+    AttemptHistory which is then kept up to date by append.
+    """
+    # Only this process writes the file, so has_external_changes never needs asking
+    shared = False
+
+    def __init__(self, filename, fsync=False):
+        self.filename = filename
+        # When True every append is forced to disk before append returns.
+        # Leaving it False lets the OS flush, which is much cheaper on slow disks.
+        self.fsync = fsync
+        self._history = None
+
+    @staticmethod
+    def _parse_rows(reader, history):
+        for record in reader:
+            # Skip rows torn by a crash in the middle of an append
+            if len(record) != len(FIELDNAMES):
+                continue
+            try:
+                history.append(*record)
+            except (KeyError, ValueError):
+                continue
+        return history
+
+    def _parse(self):
+        history = AttemptHistory()
+        try:
+            with open(self.filename, 'r', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # header
+                self._parse_rows(reader, history)
+        except FileNotFoundError:
+            pass
+        return history
+
+    def position(self):
+        """Where the file ends now, for read_since to pick up the attempts appended after it"""
+        try:
+            with open(self.filename, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                f.seek(max(0, stat.st_size - POSITION_TAIL_BYTES))
+                tail = f.read(stat.st_size)
+        except FileNotFoundError:
+            return {'size': 0, 'mtime_ns': 0, 'tail': hashlib.sha1(b'').hexdigest()}
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'tail': hashlib.sha1(tail).hexdigest()}
+
+    def read_since(self, position):
+        """
+        Attempts appended after a position from position(), or None if the
+        file has been rewritten since (e.g. compacted) and must be read in full.
+        """
+        size = position['size']
+        try:
+            f = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return AttemptHistory() if size == 0 else None
+        with f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == size and stat.st_mtime_ns == position['mtime_ns']:
+                return AttemptHistory()
+            if stat.st_size < size:
+                return None
+            f.seek(max(0, size - POSITION_TAIL_BYTES))
+            if hashlib.sha1(f.read(size - f.tell())).hexdigest() != position['tail']:
+                return None
+            appended = f.read().decode('utf-8', errors='replace')
+        # Read from an empty file this includes the header, which is skipped like a torn row
+        return self._parse_rows(csv.reader(io.StringIO(appended, newline='')), AttemptHistory())
+
+    def load(self):
+        if self._history is None:
+            self._history = self._parse()
+        return self._history
+
+    def recent(self, window_size):
+        """Attempts that can still be inside a topic's rolling window, oldest first"""
+        # A flat file has no index, so every row has to be read anyway
+        return self.load()
+
+    def between(self, start=None, end=None, topic=None):
+        """Attempts with start <= date <= end, optionally for a single topic"""
+        history = self.load()
+        start = date_to_timestamp(start) if start is not None else None
+        end = date_to_timestamp(end) if end is not None else None
+        topic_id = history.topic_index.get(topic) if topic is not None else None
+        
+        result = AttemptHistory()
+        if topic is not None and topic_id is None:
+            return result
+        for i, timestamp in enumerate(history.timestamps):
+            if ((topic_id is None or history.topic_ids[i] == topic_id)
+                    and (start is None or timestamp >= start)
+                    and (end is None or timestamp <= end)):
+                result.append_from(history, i)
+        return result
+
+    def has_external_changes(self):
+        return False
+
+    def _append_prefix(self):
+        """
+        Bytes that must be written before new rows so they land on a fresh line
+        below a complete header, even if a previous write was interrupted.
+        """
+        try:
+            with open(self.filename, 'rb') as f:
+                head = f.read(len(HEADER_LINE))
+                if len(head) < len(HEADER_LINE) and HEADER_LINE.startswith(head):
+                    # Empty file or a header that was only partially written
+                    return None
+                f.seek(-1, os.SEEK_END)
+                return b'' if f.read(1) == b'\n' else b'\r\n'
+        except FileNotFoundError:
+            return None
+
+    def append(self, attempts):
+        """Append an AttemptHistory of new attempts without touching existing rows"""
+        prefix = self._append_prefix()
+        mode = 'w' if prefix is None else 'a'
+
+        with open(self.filename, mode, newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            if prefix is None:
+                writer.writeheader()
+            elif prefix:
+                f.write(prefix.decode())
+            writer.writerows(attempts)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        
+        if self._history is not None:
+            self._history.extend(attempts)
+
+    def compact(self, keep_last=None):
+        """
+        Rewrite the data file from scratch, dropping rows torn by crashes.
+        The new file is swapped in atomically so a crash never leaves a half-written history.
+        """
+        data = self._parse()
+        if keep_last is not None:
+            data = keep_last_per_topic(data, keep_last)
+
+        tmp_path = self.filename + '.tmp'
+        with open(tmp_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.filename)
+        self._history = data
+
+        return len(data)
+
+class SqliteAttemptStore:
+    """
+    Attempt history kept in an SQLite database indexed on (topic, date).
+    The database runs in WAL mode so several app instances can write to it at once.
+    Queries return AttemptHistory objects, like CsvAttemptStore.
+    """
+    shared = True
+
+    def __init__(self, filename, fsync=False):
+        self.filename = filename
+        # The background writer in the GUI uses the connection from another thread
+        self.conn = sqlite3.connect(filename, timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable against application crashes, FULL also against power loss
+        self.conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    id INTEGER PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    correct INTEGER NOT NULL,
+                    date TEXT NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS attempts_topic_date ON attempts (topic, date)")
+        self._data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        # Changes whenever another connection commits to the database
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _query(self, sql, params=()):
+        history = AttemptHistory()
+        for topic, difficulty, correct, date in self.conn.execute(sql, params):
+            history.append(topic, difficulty, bool(correct), date)
+        return history
+
+    def load(self):
+        return self._query("SELECT topic, difficulty, correct, date FROM attempts ORDER BY id")
+
+    def recent(self, window_size):
+        """The last window_size rows of every topic, oldest first"""
+        self._data_version = self._read_data_version()
+        return self._query("""
+            SELECT topic, difficulty, correct, date FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY topic ORDER BY date DESC, id DESC) AS rn
+                FROM attempts
+            ) WHERE rn <= ? ORDER BY date, id""", (window_size,))
+
+    def between(self, start=None, end=None, topic=None):
+        """Rows with start <= date <= end, optionally for a single topic"""
+        conditions = []
+        params = []
+        if topic is not None:
+            conditions.append("topic = ?")
+            params.append(topic)
+        if start is not None:
+            conditions.append("date >= ?")
+            params.append(format_date(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            params.append(format_date(end))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"SELECT topic, difficulty, correct, date FROM attempts {where} ORDER BY date, id", params)
+
+    def position(self):
+        # recent() is an indexed query already, so there is nothing to gain from replaying
+        return None
+
+    def read_since(self, position):
+        return None
+
+    def has_external_changes(self):
+        """True if another app instance has written since the last call to recent()"""
+        return self._read_data_version() != self._data_version
+
+    def append(self, attempts):
+        """Insert an AttemptHistory of new attempts in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO attempts (topic, difficulty, correct, date) VALUES (?, ?, ?, ?)",
+                [
+                    (attempts.topics[topic_id], DIFFICULTIES[outcome >> 1], outcome & 1, timestamp_to_date(timestamp))
+                    for topic_id, outcome, timestamp in zip(attempts.topic_ids, attempts.outcomes, attempts.timestamps)
+                ]
+            )
+
+    def compact(self, keep_last=None):
+        """Drop all but the last keep_last attempts per topic and reclaim the free space"""
+        if keep_last is not None:
+            with self.conn:
+                self.conn.execute("""
+                    DELETE FROM attempts WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (PARTITION BY topic ORDER BY date DESC, id DESC) AS rn
+                            FROM attempts
+                        ) WHERE rn > ?
+                    )""", (keep_last,))
+        self.conn.execute("VACUUM")
+        return self.conn.execute("SELECT COUNT(*) FROM attempts").fetchone()[0]
+
+    def import_csv(self, csv_filename):
+        """One-shot import of an existing CSV history into an empty database"""
+        if self.conn.execute("SELECT 1 FROM attempts LIMIT 1").fetchone():
+            raise RuntimeError(f"{self.filename} already contains attempts, refusing to import twice")
+        history = CsvAttemptStore(csv_filename).load()
+        self.append(history)
+        return len(history)
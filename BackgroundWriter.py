@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+
+class BackgroundWriter:
+    """
+    Runs file writes on a worker thread, one at a time and in the order they
+    were submitted, so the Tk event loop never waits on the disk.
+    Writes submitted in a burst are coalesced: consecutive writes with the
+    same function are combined into one call, their payloads joined with extend.
+    Completion callbacks run back on the Tk thread, picked up by polling with root.after.
+    """
+    def __init__(self, root, coalesce_delay=0.05, poll_ms=50):
+        self.root = root
+        self.coalesce_delay = coalesce_delay
+        self.poll_ms = poll_ms
+        self.writes = queue.Queue()
+        self.finished = queue.Queue()  # (on_done callbacks, error) of finished writes
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self._poll()
+
+    def submit(self, write, payload, on_done=None):
+        """
+        Call write(payload) on the worker thread. payload is handed over and may
+        be extended with later payloads. on_done(error) is called on the Tk
+        thread afterwards, error being None if the write succeeded.
+        """
+        if self.closed:
+            raise RuntimeError("BackgroundWriter is closed")
+        self.writes.put((write, payload, on_done))
+
+    def flush(self):
+        """Wait until everything submitted so far is written"""
+        self.writes.join()
+
+    def close(self):
+        """Write everything still queued and stop the worker; safe to call more than once"""
+        if self.closed:
+            return
+        self.closed = True
+        self.writes.put(None)
+        self.thread.join()
+        self._report()
+
+    def _run(self):
+        while True:
+            first = self.writes.get()
+            if first is not None:
+                # Give the rest of a burst a moment to arrive
+                time.sleep(self.coalesce_delay)
+            batch = [first]
+            while True:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            stopping = None in batch
+            self._write_batch([item for item in batch if item is not None])
+            for _ in batch:
+                self.writes.task_done()
+            if stopping:
+                return
+
+    def _write_batch(self, batch):
+        i = 0
+        while i < len(batch):
+            write, payload, on_done = batch[i]
+            callbacks = [on_done]
+            i += 1
+            while i < len(batch) and batch[i][0] == write:
+                payload.extend(batch[i][1])
+                callbacks.append(batch[i][2])
+                i += 1
+
+            try:
+                write(payload)
+                error = None
+            except Exception as e:
+                error = e
+            self.finished.put((callbacks, error))
+
+    def _report(self):
+        while True:
+            try:
+                callbacks, error = self.finished.get_nowait()
+            except queue.Empty:
+                return
+            reported = False
+            for on_done in callbacks:
+                if on_done is not None:
+                    on_done(error)
+                    reported = True
+            if error is not None and not reported:
+                print(f"Background write failed: {error}")
+
+    def _poll(self):
+        self._report()
+        if not self.closed:
+            self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,64 @@
+import threading
+
+SMOOTHING = 0.2  # Weight of the newest batch in the running averages
+
+class BatchStats:
+    """Running averages of how batches of one size have done"""
+    def __init__(self):
+        self.batches = 0
+        self.success = 1.0  # Fraction of questions whose answers could be parsed
+        self.per_second = 0.0  # Parsed questions per second of latency
+        self.per_token = 0.0  # Parsed questions per token used
+
+    def add(self, success, per_second, per_token):
+        if self.batches == 0:
+            self.success, self.per_second, self.per_token = success, per_second, per_token
+        else:
+            self.success += SMOOTHING * (success - self.success)
+            self.per_second += SMOOTHING * (per_second - self.per_second)
+            self.per_token += SMOOTHING * (per_token - self.per_token)
+        self.batches += 1
+
+    def score(self):
+        # Questions per second and per token both matter, so neither can be traded away entirely
+        return self.per_second * self.per_token
+
+class BatchSizer:
+    """
+    Picks the number of questions per validation request, between min_size and
+    max_size. Every request reports how many answers parsed, how long it took
+    and how many tokens it used. If too many answers fail to parse the size is
+    halved; otherwise it moves to a neighbouring size that has done better, or
+    tries the next size up that hasn't been measured yet.
+    Thread-safe; with min_size == max_size the size is fixed.
+    """
+    def __init__(self, size, min_size=None, max_size=None, target_success=0.8):
+        self.min_size = size if min_size is None else min_size
+        self.max_size = size if max_size is None else max_size
+        self.size = max(self.min_size, min(self.max_size, size))
+        self.target_success = target_success
+        self.stats = {}  # batch size -> BatchStats
+        self.lock = threading.Lock()
+
+    def record(self, size, parsed, latency, tokens):
+        with self.lock:
+            stats = self.stats.setdefault(size, BatchStats())
+            stats.add(parsed / size, parsed / max(latency, 1e-6), parsed / max(tokens, 1))
+            # Only results for the current size say anything about moving away from it
+            if size == self.size:
+                self._adapt(stats)
+
+    def _adapt(self, stats):
+        if stats.success < self.target_success:
+            new_size = max(self.min_size, self.size // 2)
+        else:
+            new_size = self.size
+            larger = self.stats.get(self.size + 1)
+            smaller = self.stats.get(self.size - 1)
+            if self.size < self.max_size and (larger is None or larger.score() > stats.score()):
+                new_size = self.size + 1
+            elif self.size > self.min_size and smaller is not None and smaller.score() > stats.score():
+                new_size = self.size - 1
+        if new_size != self.size:
+            print(f"Validation batch size {self.size} -> {new_size}")
+            self.size = new_size
@@ -0,0 +1,83 @@
+import random
+import re
+import zlib
+
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_HASHES = 64  # MinHash signature length
+BANDS = 16  # LSH bands of NUM_HASHES // BANDS rows; candidates need one identical band
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed so signatures are comparable between runs
+_rng = random.Random(1234)
+HASH_PARAMS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(MERSENNE_PRIME)) for _ in range(NUM_HASHES)]
+
+def shingles(text):
+    """Hashed overlapping word n-grams of the text, ignoring case and punctuation"""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))}
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+def minhash(shingle_hashes):
+    # Each (a, b) pair is one random permutation of the shingle hashes
+    return tuple(
+        min([(a * x + b) % MERSENNE_PRIME for x in shingle_hashes])
+        for a, b in HASH_PARAMS
+    )
+
+def question_text(question):
+    """The part of a question that makes it a duplicate of another: passage and prompt"""
+    return f"{question.get('passage', '')}\n{question.get('prompt', '')}"
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index of question texts for spotting near-duplicates.
+    Texts whose estimated Jaccard similarity of word shingles reaches threshold
+    count as duplicates. Lookups only compare against texts that share an LSH
+    band, so they stay fast as the bank grows.
+    """
+    def __init__(self, threshold=0.7):
+        self.threshold = threshold
+        self.rows = NUM_HASHES // BANDS
+        self.signatures = {}  # key -> signature
+        self.buckets = {}  # (band, band values) -> set of keys
+
+    def _bands(self, signature):
+        for band in range(BANDS):
+            yield (band, signature[band * self.rows:(band + 1) * self.rows])
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, key, text):
+        signature = minhash(shingles(text))
+        self.signatures[key] = signature
+        for band in self._bands(signature):
+            self.buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key):
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band in self._bands(signature):
+            bucket = self.buckets.get(band)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band]
+
+    def find_duplicate(self, text):
+        """Key of an indexed text that is a near-duplicate of text, or None"""
+        signature = minhash(shingles(text))
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self.buckets.get(band, set())
+        for key in candidates:
+            other = self.signatures[key]
+            similarity = sum(a == b for a, b in zip(signature, other)) / NUM_HASHES
+            if similarity >= self.threshold:
+                return key
+        return None
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import random
+import re
+from DuplicateIndex import DuplicateIndex
+
+CHARS_PER_TOKEN = 4  # Rough estimate, same as the request scheduler's
+MIN_EXAMPLE_CHARS = 40  # Shorter chunks are page headers, footers and other PDF debris
+MAX_EXAMPLE_TOKENS = 1000  # Longer chunks are usually several questions run together
+EXAMPLE_DUPLICATE_THRESHOLD = 0.9
+SAMPLE_TRIES = 4  # Examples looked at per example wanted when fitting a token budget
+
+def count_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def clean_example(text):
+    """Undo the usual PDF-to-text damage: hyphenated line breaks, stray control characters and runs of spaces"""
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    text = re.sub(r"[^\S\n]+", " ", text)
+    text = re.sub(r"[\x00-\x08\x0b-\x1f\x7f]", "", text)
+    return "\n".join(line.strip() for line in text.split("\n") if line.strip())
+
+def preprocess_examples(text, separator):
+    """Cleaned, length-bounded and deduplicated examples of an example file, as {text, tokens} dicts"""
+    duplicates = DuplicateIndex(EXAMPLE_DUPLICATE_THRESHOLD)
+    examples = []
+    dropped = 0
+    for chunk in text.split(separator):
+        example = clean_example(chunk)
+        tokens = count_tokens(example)
+        if len(example) < MIN_EXAMPLE_CHARS or tokens > MAX_EXAMPLE_TOKENS:
+            dropped += 1
+            continue
+        if duplicates.find_duplicate(example) is not None:
+            dropped += 1
+            continue
+        duplicates.add(len(examples), example)
+        examples.append({'text': example, 'tokens': tokens})
+    print(f"Kept {len(examples)} examples, dropped {dropped} too short, too long or duplicated")
+    return examples
+
+class ExampleStore:
+    """
+    Example questions of one example file, cleaned and deduplicated once and
+    cached in cache_dir. The cache is reused while the file's size and mtime
+    are unchanged, or its content hash still matches, and the preprocessing
+    settings are the same. Raises ValueError if no example is left.
+    """
+    def __init__(self, input_file, separator="\n\n", cache_dir='.example_cache'):
+        self.input_file = input_file
+        self.separator = separator
+        name = hashlib.sha1(os.path.abspath(input_file).encode('utf-8')).hexdigest()[:16]
+        self.cache_file = os.path.join(cache_dir, f"{name}.json")
+        self.examples = self.load()
+        if not self.examples:
+            raise ValueError(
+                f"No usable examples in {input_file}: every chunk between {separator!r} separators is shorter "
+                f"than {MIN_EXAMPLE_CHARS} characters, longer than {MAX_EXAMPLE_TOKENS} tokens or a duplicate"
+            )
+        self.texts = [example['text'] for example in self.examples]
+        self.tokens = [example['tokens'] for example in self.examples]
+
+    def __len__(self):
+        return len(self.examples)
+
+    def settings(self):
+        return [self.separator, MIN_EXAMPLE_CHARS, MAX_EXAMPLE_TOKENS, EXAMPLE_DUPLICATE_THRESHOLD, CHARS_PER_TOKEN]
+
+    def load(self):
+        stat = os.stat(self.input_file)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache['settings'] == self.settings() and cache['signature'] == signature:
+                return cache['examples']
+        except (FileNotFoundError, ValueError, KeyError):
+            cache = None
+
+        with open(self.input_file, 'rb') as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+        if cache is not None and cache.get('settings') == self.settings() and cache.get('sha256') == content_hash:
+            # Touched but not changed
+            examples = cache['examples']
+        else:
+            examples = preprocess_examples(data.decode('utf-8'), self.separator)
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump({'settings': self.settings(), 'signature': signature,
+                           'sha256': content_hash, 'examples': examples}, f)
+        except OSError:
+            pass  # Preprocessed again next time
+        return examples
+
+    def sample(self, count, token_budget):
+        """
+        Indices of up to count randomly chosen examples whose token counts add
+        up to no more than token_budget; at least the shortest example if none fit.
+        """
+        chosen = []
+        budget = token_budget
+        for index in random.sample(range(len(self.examples)), min(len(self.examples), count * SAMPLE_TRIES)):
+            if self.tokens[index] <= budget:
+                chosen.append(index)
+                budget -= self.tokens[index]
+                if len(chosen) == count:
+                    break
+        if not chosen and self.examples:
+            chosen.append(min(range(len(self.examples)), key=self.tokens.__getitem__))
+        return chosen
@@ -0,0 +1,74 @@
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+class FakeMessages:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, messages, max_tokens, temperature=1, thinking=None, **kwargs):
+        """Answer like client.messages.create, after sleeping for the configured latency"""
+        time.sleep(self.client.latency)
+        prompt = messages[-1]['content']
+
+        with self.client.lock:
+            self.client.calls += 1
+            call_number = self.client.calls
+
+        if prompt.startswith("Generate a new SAT question"):
+            text = self.client.generate_text(call_number)
+        else:
+            text = self.client.validate_text(prompt)
+
+        content = [SimpleNamespace(type='text', text=text)]
+        if thinking:
+            # Extended thinking puts a thinking block before the answer
+            content.insert(0, SimpleNamespace(type='thinking', thinking="..."))
+        usage = SimpleNamespace(input_tokens=len(prompt) // 4, output_tokens=len(text) // 4)
+        return SimpleNamespace(content=content, usage=usage, model=model)
+
+class FakeClient:
+    """
+    Offline stand-in for anthropic.Anthropic, for trying out claude_gen without an API key.
+    Generation prompts get a made-up question in the expected JSON format,
+    validation prompts a comma-separated answer per question, with
+    invalid_rate of them answered INVALID. Like the real model, it loses
+    track more often in big batches: each question adds miscount_rate to the
+    chance of leaving an answer out.
+    """
+    def __init__(self, latency=0.05, invalid_rate=0.2, miscount_rate=0.03, seed=None):
+        self.latency = latency
+        self.invalid_rate = invalid_rate
+        self.miscount_rate = miscount_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        # Keeps questions from different runs apart, since call numbers start over
+        self.run_id = uuid.uuid4().hex[:8]
+        self.messages = FakeMessages(self)
+
+    def generate_text(self, call_number):
+        return json.dumps({
+            # Random filler words so fake questions don't look like near-duplicates of each other
+            "passage": f"Fake passage number {call_number} of run {self.run_id}: "
+                       + " ".join(uuid.uuid4().hex[:6] for _ in range(20)),
+            "prompt": "Which choice best answers the question?",
+            "choices": [f"Choice {i} for question {call_number}" for i in range(4)],
+            "correct_answer": 0,
+            "used": False
+        })
+
+    def validate_text(self, prompt):
+        num_questions = len(re.findall(r"^---\n\d+\. ", prompt, flags=re.MULTILINE))
+        with self.lock:
+            answers = [
+                "INVALID" if self.random.random() < self.invalid_rate else str(self.random.randrange(4))
+                for _ in range(num_questions)
+            ]
+            if num_questions > 1 and self.random.random() < self.miscount_rate * num_questions:
+                answers.pop()
+        return ",".join(answers)
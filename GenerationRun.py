@@ -0,0 +1,133 @@
+import json
+import os
+from QuestionManager import question_id
+
+def append_jsonl(path, records):
+    """Append one JSON object per line and force it to disk"""
+    with open(path, 'a+b') as f:
+        # Start on a fresh line if a previous write was cut short
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        for record in records:
+            f.write(json.dumps(record).encode('utf-8') + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_jsonl(path):
+    """Records of a JSONL file, skipping a last line torn by a crash"""
+    records = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+def write_json_atomic(path, data, **kwargs):
+    """Write to a temporary file and swap it in, so readers never see half a file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class GenerationRun:
+    """
+    Progress of a claude_gen run. Accepted questions are streamed to an
+    append-only JSONL staging file as they validate, and a small checkpoint
+    records each job's target, counts and the candidates still waiting for
+    validation. An interrupted run can be resumed, and its questions are
+    merged into the bank with a single write at the end.
+    """
+    def __init__(self, staging_file, checkpoint_file):
+        self.staging_file = staging_file
+        self.checkpoint_file = checkpoint_file
+        self.jobs = []
+
+    def exists(self):
+        return os.path.exists(self.checkpoint_file) or os.path.exists(self.staging_file)
+
+    def save(self):
+        write_json_atomic(self.checkpoint_file, {'jobs': self.jobs})
+
+    def start(self, jobs):
+        """
+        Begin a new run. Each job is a dict with at least topic, difficulty,
+        input (the examples file) and target (number of questions to add).
+        """
+        self.jobs = [dict(job, accepted=0, pending=[]) for job in jobs]
+        open(self.staging_file, 'w').close()
+        self.save()
+        return self.jobs
+
+    def resume(self):
+        with open(self.checkpoint_file, 'r') as f:
+            self.jobs = json.load(f)['jobs']
+
+        # The staging file is written first, so it has the final say on what was accepted.
+        # A crash between staging a batch and saving the checkpoint can leave the
+        # batch both staged and pending, so count unique ids and drop what's staged from pending.
+        staged = {}
+        for record in read_jsonl(self.staging_file):
+            key = (record['topic'], record['difficulty'])
+            staged.setdefault(key, set()).add(record['question']['id'])
+        for job in self.jobs:
+            staged_ids = staged.get((job['topic'], job['difficulty']), set())
+            job['accepted'] = len(staged_ids)
+            job['pending'] = [
+                candidate for candidate in job['pending'] if question_id(candidate['question']) not in staged_ids
+            ]
+        return self.jobs
+
+    def add_accepted(self, job, questions):
+        if not questions:
+            return
+        append_jsonl(self.staging_file, [
+            {'topic': job['topic'], 'difficulty': job['difficulty'], 'question': question}
+            for question in questions
+        ])
+        job['accepted'] += len(questions)
+        self.save()
+
+    def set_pending(self, job, pending):
+        """Record the candidates generated but not yet validated, as {question, examples} dicts"""
+        job['pending'] = pending
+        self.save()
+
+    def merge(self, bank_file):
+        """
+        Add every staged question to the bank, skipping ids it already has,
+        then clear the run. Returns the number of questions added.
+        """
+        try:
+            with open(bank_file, 'r') as f:
+                bank = json.load(f)
+        except FileNotFoundError:
+            bank = {}
+
+        known_ids = {
+            q.get('id') for difficulties in bank.values() for questions in difficulties.values() for q in questions
+        }
+        added = 0
+        for record in read_jsonl(self.staging_file):
+            question = record['question']
+            if question['id'] in known_ids:
+                continue
+            known_ids.add(question['id'])
+            topic_data = bank.setdefault(record['topic'], {"e": [], "m": [], "h": []})
+            topic_data.setdefault(record['difficulty'], []).append(question)
+            added += 1
+
+        if added:
+            write_json_atomic(bank_file, bank, indent=2)
+        for path in (self.staging_file, self.checkpoint_file):
+            if os.path.exists(path):
+                os.remove(path)
+        return added
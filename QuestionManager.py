@@ -1,51 +1,266 @@
+import hashlib
 import json
+import os
 import random
+from json.decoder import WHITESPACE
+
+def question_id(question):
+    """
+    Stable id for a question, derived from its content so the same question
+    always gets the same id no matter where or when it was generated.
+    """
+    content = json.dumps([question.get('passage', ''), question['prompt'], question['choices']])
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+def scan_object(text, pos, on_member):
+    """
+    Walk the members of the JSON object starting at text[pos] without decoding
+    the values: on_member(key, value_start) must return where the value ends.
+    Returns the position just after the object.
+    """
+    decoder = json.JSONDecoder()
+    pos = WHITESPACE.match(text, pos).end()
+    if text[pos] != '{':
+        raise ValueError(f"Expected an object at position {pos}")
+    pos = WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == '}':
+        return pos + 1
+    while True:
+        key, pos = decoder.raw_decode(text, pos)
+        pos = WHITESPACE.match(text, pos).end()
+        if text[pos] != ':':
+            raise ValueError(f"Expected ':' at position {pos}")
+        pos = WHITESPACE.match(text, pos + 1).end()
+        pos = WHITESPACE.match(text, on_member(key, pos)).end()
+        if text[pos] == '}':
+            return pos + 1
+        if text[pos] != ',':
+            raise ValueError(f"Expected ',' or '}}' at position {pos}")
+        pos = WHITESPACE.match(text, pos + 1).end()
+
+def build_offset_index(data):
+    """
+    Byte ranges of every topic/difficulty question list in the raw bytes of a
+    questions file, as {topic: {difficulty: [start, end]}}.
+    """
+    text = data.decode('utf-8')
+    decoder = json.JSONDecoder()
+    sections = {}
+    # Convert character positions to byte positions incrementally, they only move forward
+    last_char, last_byte = 0, 0
+    
+    def byte_offset(char_pos):
+        nonlocal last_char, last_byte
+        last_byte += len(text[last_char:char_pos].encode('utf-8'))
+        last_char = char_pos
+        return last_byte
+    
+    def on_difficulty(topic, difficulty, start):
+        _, end = decoder.raw_decode(text, start)
+        sections[topic][difficulty] = [byte_offset(start), byte_offset(end)]
+        return end
+    
+    def on_topic(topic, start):
+        sections[topic] = {}
+        return scan_object(text, start, lambda difficulty, pos: on_difficulty(topic, difficulty, pos))
+    
+    if text.strip():
+        scan_object(text, 0, on_topic)
+    return sections
+
+class UnusedPool:
+    """
+    Unused question ids for one topic and difficulty.
+    Items live in a list with a reverse index, so a random draw and a
+    removal (swapping the last item into the hole) are both O(1).
+    """
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.positions = {item: i for i, item in enumerate(self.items)}
+        
+    def __len__(self):
+        return len(self.items)
+    
+    def __contains__(self, item):
+        return item in self.positions
+    
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+            
+    def remove(self, item):
+        i = self.positions.pop(item, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.positions[last] = i
+            
+    def choice(self):
+        return random.choice(self.items)
 
 class QuestionManager:
-    def __init__(self, questions_file='questions.json'):
+    def __init__(self, questions_file='questions.json', used_file=None, index_file=None):
+        """
+        questions_file holds the question content and is only read.
+        Which questions have been answered is journaled separately in used_file
+        (questions_used.log next to the bank by default), one id per line.
+        index_file caches where each topic/difficulty list sits in questions_file
+        (questions_index.json by default), so only the lists being practiced are parsed.
+        """
         self.questions_file = questions_file
+        base = os.path.splitext(questions_file)[0]
+        self.used_file = used_file or base + '_used.log'
+        self.index_file = index_file or base + '_index.json'
         self.load_questions()
         
-    def load_questions(self):
+    def load_used_ids(self):
         try:
-            with open(self.questions_file, 'r') as f:
-                self.questions = json.load(f)
+            with open(self.used_file, 'r') as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+        
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.questions_file)
         except FileNotFoundError:
-            self.questions = {}
-            
-    def save_questions(self):
-        with open(self.questions_file, 'w') as f:
-            json.dump(self.questions, f, indent=2)
-            
-    def get_question(self, topic, difficulty):
-        if topic not in self.questions or not self.questions[topic][difficulty]:
             return None
-            
-        questions = self.questions[topic][difficulty]
-        unused_questions = [q for q in questions if not q.get('used', False)]
+        return [stat.st_size, stat.st_mtime_ns]
         
-        if not unused_questions:
+    def load_questions(self):
+        """Read the offset index and the used journal; question lists are loaded on demand"""
+        # Lists loaded so far, as {topic: {difficulty: [question, ...]}}
+        self.questions = {}
+        self.by_id = {}
+        self.unused = {}
+        self.reserved = set()  # Ids taken out of the unused pools by reserve_question
+        self.used_ids = self.load_used_ids()
+        self.signature = self._file_signature()
+        self.sections = self.load_offset_index()
+        
+    def load_offset_index(self):
+        if self.signature is None:
+            return {}
+        
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+            if index.get('signature') == self.signature:
+                return index['sections']
+        except (FileNotFoundError, ValueError):
+            pass
+        
+        # Missing or made for an older version of the bank: scan the file once
+        with open(self.questions_file, 'rb') as f:
+            sections = build_offset_index(f.read())
+        try:
+            with open(self.index_file, 'w') as f:
+                json.dump({'signature': self.signature, 'sections': sections}, f)
+        except OSError:
+            pass  # A read-only install just rebuilds the index next time
+        return sections
+    
+    def refresh(self):
+        """Start over if questions_file has changed, e.g. after claude_gen added questions"""
+        if self._file_signature() != self.signature:
+            self.load_questions()
+    
+    def topics(self):
+        return list(self.sections)
+    
+    def load_section(self, topic, difficulty):
+        """Parse one topic/difficulty list from the bank and index its questions"""
+        if (topic, difficulty) in self.unused:
+            return self.unused[(topic, difficulty)]
+        
+        bounds = self.sections.get(topic, {}).get(difficulty)
+        if bounds is None:
+            return None
+        
+        start, end = bounds
+        with open(self.questions_file, 'rb') as f:
+            f.seek(start)
+            questions = json.loads(f.read(end - start))
+        self.questions.setdefault(topic, {})[difficulty] = questions
+        
+        pool = self.unused[(topic, difficulty)] = UnusedPool()
+        for q in questions:
+            if 'id' not in q:
+                # The id only depends on the content, so it is the same every time
+                q['id'] = question_id(q)
+            self.by_id.setdefault(q['id'], (topic, difficulty, q))
+            if not self.is_used(q):
+                pool.add(q['id'])
+        return pool
+    
+    def is_used(self, question):
+        # 'used' flags stored in the bank itself are still honoured
+        return question.get('used', False) or question['id'] in self.used_ids
+            
+    def get_question(self, topic, difficulty):
+        pool = self.load_section(topic, difficulty)
+        if not pool:
             return None  # Return None instead of resetting all questions
             
-        selected_question = random.choice(unused_questions)
+        _, _, selected_question = self.by_id[pool.choice()]
         
         # Format the question data to match the expected structure in the GUI
         formatted_question = {
+            'id': selected_question['id'],
             'question': f"{selected_question.get('passage', '')}\n\n{selected_question['prompt']}" if selected_question.get('passage') else selected_question['prompt'],
             'choices': selected_question['choices'],
             'correct_answer': selected_question['correct_answer'],
-            'used': selected_question['used']
+            'used': self.is_used(selected_question)
         }
         
         return formatted_question
     
-    def mark_question_as_used(self, topic, difficulty, question_text):
-        if topic in self.questions and difficulty in self.questions[topic]:
-            questions = self.questions[topic][difficulty]
-            for q in questions:
-                if q['passage'] in question_text:
-                    q['used'] = True
-                    self.save_questions()
-                    break
-        else:
-            print("Invalid topic or difficulty level for marking.")
\ No newline at end of file
+    def reserve_question(self, topic, difficulty):
+        """
+        Like get_question, but the question is also taken out of the unused pool
+        until it is marked as used or handed back with release_question, so
+        questions prepared ahead of time are not drawn again.
+        """
+        question = self.get_question(topic, difficulty)
+        if question is not None:
+            self.unused[(topic, difficulty)].remove(question['id'])
+            self.reserved.add(question['id'])
+        return question
+    
+    def release_question(self, question_id):
+        """Put a reserved question that was not answered back into the unused pool"""
+        if question_id not in self.reserved:
+            return
+        self.reserved.discard(question_id)
+        topic, difficulty, question = self.by_id[question_id]
+        if not self.is_used(question):
+            self.unused[(topic, difficulty)].add(question_id)
+    
+    def mark_question_as_used(self, question_id, save=True):
+        """
+        Take the question out of the unused pool. With save=False it is not
+        journaled yet; pass the id to append_used_ids later, e.g. from a background thread.
+        """
+        if question_id not in self.by_id:
+            print(f"Unknown question id {question_id} for marking.")
+            return
+        
+        topic, difficulty, _ = self.by_id[question_id]
+        self.used_ids.add(question_id)
+        self.reserved.discard(question_id)
+        self.unused[(topic, difficulty)].remove(question_id)
+        if save:
+            self.append_used_ids([question_id])
+        
+    def append_used_ids(self, question_ids):
+        """Journal used ids, a few bytes each instead of rewriting the whole bank"""
+        with open(self.used_file, 'a+b') as f:
+            # Start on a fresh line if a previous write was cut short
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(b''.join(question_id.encode() + b'\n' for question_id in question_ids))
\ No newline at end of file
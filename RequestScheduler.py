@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+import anthropic
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server-side errors (529 = overloaded)
+TRANSIENT_STATUS_CODES = {408, 409, 429}
+
+def is_transient(error):
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in TRANSIENT_STATUS_CODES or error.status_code >= 500
+    return False
+
+def retry_after(error):
+    """Seconds the API asked us to wait before retrying, if it said"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute, holding at
+    most one minute's worth. acquire blocks until enough tokens are available.
+    """
+    def __init__(self, rate_per_minute):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # A single request bigger than the whole bucket only has to wait for a full one
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        """Give back (positive) or take away (negative) tokens once the real cost is known"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class ScheduledMessages:
+    def __init__(self, client, scheduler):
+        self.client = client
+        self.scheduler = scheduler
+
+    def create(self, **request):
+        return self.scheduler.call(self.client, **request)
+
+class ScheduledClient:
+    """Drop-in replacement for a client whose messages.create goes through a RequestScheduler"""
+    def __init__(self, client, scheduler):
+        self.client = client
+        self.messages = ScheduledMessages(client, scheduler)
+
+class RequestScheduler:
+    """
+    Keeps API calls within requests-per-minute and tokens-per-minute limits,
+    shared by every thread using it, and retries transient errors
+    (rate limits, overload, connection problems) with exponential backoff and jitter.
+    """
+    def __init__(self, requests_per_minute=50, tokens_per_minute=40000, max_retries=5,
+                 base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def wrap(self, client):
+        return ScheduledClient(client, self)
+
+    @staticmethod
+    def estimate_tokens(request):
+        # Roughly 4 characters per input token, plus the whole output budget
+        prompt_chars = sum(len(str(message['content'])) for message in request.get('messages', []))
+        return prompt_chars // 4 + request.get('max_tokens', 0)
+
+    def backoff(self, attempt):
+        """Full jitter: a random delay up to the exponentially growing cap"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, client, **request):
+        estimated = self.estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire()
+            self.tokens.acquire(estimated)
+            try:
+                response = client.messages.create(**request)
+            except Exception as e:
+                # A failed request doesn't use up the tokens set aside for it
+                self.tokens.adjust(estimated)
+                if not is_transient(e) or attempt == self.max_retries:
+                    raise
+                delay = retry_after(e) or self.backoff(attempt)
+                print(f"Transient API error ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                self.tokens.adjust(estimated - usage.input_tokens - usage.output_tokens)
+            return response
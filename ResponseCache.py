@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+from types import SimpleNamespace
+
+def response_to_dict(response):
+    blocks = []
+    for block in response.content:
+        blocks.append({
+            'type': getattr(block, 'type', 'text'),
+            'text': getattr(block, 'text', None),
+            'thinking': getattr(block, 'thinking', None)
+        })
+    usage = getattr(response, 'usage', None)
+    return {
+        'content': blocks,
+        'usage': {
+            'input_tokens': getattr(usage, 'input_tokens', 0),
+            'output_tokens': getattr(usage, 'output_tokens', 0)
+        }
+    }
+
+def response_from_dict(data):
+    return SimpleNamespace(
+        content=[SimpleNamespace(**block) for block in data['content']],
+        usage=SimpleNamespace(**data['usage'])
+    )
+
+class CachedMessages:
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    def create(self, **request):
+        return self.cache.call(self.client, **request)
+
+class CachedClient:
+    """Drop-in replacement for a client whose messages.create answers from a ResponseCache when it can"""
+    def __init__(self, client, cache):
+        self.client = client
+        self.messages = CachedMessages(client, cache)
+
+class ResponseCache:
+    """
+    On-disk cache of model responses, one JSON file per request named by the
+    hash of the request (model, prompt and parameters). When the files add up to
+    more than max_bytes, the least recently used ones are deleted.
+
+    Repeating a prompt within a run usually means asking for another sample,
+    so the n-th identical request in a process is cached separately from the
+    first: a rerun replays the same responses in the same order, and a run
+    that asks for more samples than were cached goes on to the API.
+    That only makes sense for a rerun meant to repeat an earlier one, so
+    sampled requests (temperature above 0) bypass the cache unless
+    replay_samples is set; otherwise a new run would get the last run's
+    samples back first.
+    """
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024, replay_samples=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.replay_samples = replay_samples
+        self.lock = threading.Lock()
+        self.occurrences = {}  # request hash -> times requested so far in this process
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def wrap(self, client):
+        return CachedClient(client, self)
+
+    def _path(self, request):
+        request_hash = hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        with self.lock:
+            occurrence = self.occurrences.get(request_hash, 0)
+            self.occurrences[request_hash] = occurrence + 1
+        return os.path.join(self.directory, f"{request_hash}-{occurrence}.json")
+
+    def call(self, client, **request):
+        if not self.replay_samples and request.get('temperature', 1) > 0:
+            return client.messages.create(**request)
+        path = self._path(request)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            # Touch the file so eviction sees it as recently used
+            os.utime(path)
+            return response_from_dict(data)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        response = client.messages.create(**request)
+        self._store(path, response_to_dict(response))
+        return response
+
+    def _store(self, path, data):
+        encoded = json.dumps(data).encode('utf-8')
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(encoded)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is back under 90% of max_bytes"""
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith('.json')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        self.total_bytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,90 @@
+import numpy as np
+from AttemptStore import DIFFICULTIES
+from SkillTracker import SCORES
+
+class ScoringEngine:
+    """
+    Vectorized version of SkillTracker's rolling-window knowledge score.
+    Works on a whole AttemptHistory at once, so it can score every topic,
+    or every point of every topic's history, in one pass. The window size and
+    the points table can be changed to see how scores would look under other rules.
+    """
+    def __init__(self, window_size=20, scores=None):
+        scores = scores or SCORES
+        self.window_size = window_size
+        # Points per outcome code (difficulty index * 2 + correct), see AttemptStore.encode_outcome
+        self.points = np.array([scores[d]['right' if correct else 'wrong'] for d in DIFFICULTIES for correct in (False, True)])
+        self.max_points = np.array([scores[d]['right'] for d in DIFFICULTIES for _ in (False, True)])
+        self.min_points = np.array([scores[d]['wrong'] for d in DIFFICULTIES for _ in (False, True)])
+
+    def _rolling_scores(self, history):
+        """
+        Score after every attempt, grouped by topic.
+        Returns (order, topic_ids, scores) where order sorts the history by topic
+        (keeping time order within a topic) and the other two follow that order.
+        """
+        topic_ids = np.frombuffer(history.topic_ids, dtype=np.uint32)
+        outcomes = np.frombuffer(history.outcomes, dtype=np.uint8)
+
+        order = np.argsort(topic_ids, kind='stable')
+        topic_ids = topic_ids[order]
+        outcomes = outcomes[order]
+
+        # First position of each attempt's topic in the sorted arrays
+        positions = np.arange(len(order))
+        is_group_start = np.empty(len(order), dtype=bool)
+        is_group_start[:1] = True
+        is_group_start[1:] = topic_ids[1:] != topic_ids[:-1]
+        group_start = np.maximum.accumulate(np.where(is_group_start, positions, 0))
+        window_start = np.maximum(group_start, positions - self.window_size + 1)
+
+        def window_sum(values):
+            cumulative = np.concatenate(([0], np.cumsum(values)))
+            return cumulative[positions + 1] - cumulative[window_start]
+
+        total = window_sum(self.points[outcomes])
+        max_possible = window_sum(self.max_points[outcomes])
+        min_possible = window_sum(self.min_points[outcomes])
+
+        # Normalize to 0-100 scale, 50 when the window can't move the score
+        score_range = max_possible - min_possible
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = ((total - min_possible) / score_range) * 100
+        scores = np.where(score_range == 0, 50, np.round(normalized)).astype(int)
+
+        return order, topic_ids, scores
+
+    def score_all(self, history, topics=None):
+        """Current score of every topic in the history (or of the given topics) as a dict"""
+        if not len(history):
+            return {topic: 0 for topic in topics or []}
+
+        _, topic_ids, scores = self._rolling_scores(history)
+        # The last attempt of each topic holds its current score
+        is_group_end = np.append(topic_ids[1:] != topic_ids[:-1], True)
+        current = {history.topics[t]: int(s) for t, s in zip(topic_ids[is_group_end], scores[is_group_end])}
+
+        if topics is None:
+            return current
+        return {topic: current.get(topic, 0) for topic in topics}
+
+    def trajectories(self, history, topics=None):
+        """
+        Score after every attempt for each topic, as {topic: (timestamps, scores)}.
+        Timestamps are the attempts' AttemptHistory timestamps in seconds.
+        """
+        if not len(history):
+            return {}
+
+        order, topic_ids, scores = self._rolling_scores(history)
+        timestamps = np.frombuffer(history.timestamps, dtype=np.int64)[order]
+
+        bounds = np.flatnonzero(np.append(True, topic_ids[1:] != topic_ids[:-1]))
+        bounds = np.append(bounds, len(order))
+
+        result = {}
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            topic = history.topics[topic_ids[start]]
+            if topics is None or topic in topics:
+                result[topic] = (timestamps[start:end], scores[start:end])
+        return result
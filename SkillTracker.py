@@ -1,8 +1,11 @@
-import csv
+import json
 import random
+from collections import deque
 from datetime import datetime
 import os
 import sys
+import threading
+from AttemptStore import CsvAttemptStore, SqliteAttemptStore, AttemptHistory, DIFFICULTIES
 
 def resource_path(relative_path):
     try:
@@ -11,74 +14,257 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+STORES = {
+    'csv': CsvAttemptStore,
+    'sqlite': SqliteAttemptStore
+}
+
+# Points for a wrong/right answer at each difficulty
+SCORES = {
+    'e': {'wrong': -3, 'right': 1},
+    'm': {'wrong': -2, 'right': 2}, 
+    'h': {'wrong': -1, 'right': 3}
+}
+
+# The same points laid out by outcome code (difficulty index * 2 + correct)
+OUTCOME_POINTS = [SCORES[d]['right' if correct else 'wrong'] for d in DIFFICULTIES for correct in (False, True)]
+OUTCOME_MAX = [SCORES[d]['right'] for d in DIFFICULTIES for _ in (False, True)]
+OUTCOME_MIN = [SCORES[d]['wrong'] for d in DIFFICULTIES for _ in (False, True)]
+
+class TopicWindow:
+    """
+    The last window_size attempt outcomes for one topic, with running sums so
+    the knowledge score can be read without looking at the attempts again.
+    """
+    __slots__ = ('attempts', 'total_score', 'max_possible', 'min_possible')
+    
+    def __init__(self, window_size):
+        self.attempts = deque(maxlen=window_size)
+        self.total_score = 0
+        self.max_possible = 0
+        self.min_possible = 0
+        
+    def add(self, outcome):
+        if len(self.attempts) == self.attempts.maxlen:
+            # The oldest attempt falls out of the window
+            oldest = self.attempts[0]
+            self.total_score -= OUTCOME_POINTS[oldest]
+            self.max_possible -= OUTCOME_MAX[oldest]
+            self.min_possible -= OUTCOME_MIN[oldest]
+        self.attempts.append(outcome)
+        self.total_score += OUTCOME_POINTS[outcome]
+        self.max_possible += OUTCOME_MAX[outcome]
+        self.min_possible += OUTCOME_MIN[outcome]
+        
+    def score(self):
+        if not self.attempts:
+            return 0
+        
+        # Normalize to 0-100 scale
+        score_range = self.max_possible - self.min_possible
+        if score_range == 0:
+            return 50
+        
+        normalized_score = ((self.total_score - self.min_possible) / score_range) * 100
+        
+        return round(normalized_score)
+
 class SkillTracker:
-    def __init__(self, filename='skill_data.csv'):
+    def __init__(self, filename='skill_data.csv', fsync=False, backend='csv'):
+        """
+        backend selects where the attempt history lives: 'csv' for an append-only
+        CSV file or 'sqlite' for an indexed SQLite database at filename.
+        With fsync=True every write is forced to disk before it returns.
+        The rolling windows are saved to a snapshot next to the data file
+        (skill_data_snapshot.json), so a restart only reads the attempts added since.
+        """
         self.filename = resource_path(filename)
+        self.snapshot_file = os.path.splitext(self.filename)[0] + '_snapshot.json'
         self.window_size = 20
+        self.store = STORES[backend](self.filename, fsync=fsync)
+        # Writes may come from a background thread, see write_attempts. The windows
+        # are only used from the caller's thread, so reading scores doesn't wait on a write.
+        self.store_lock = threading.Lock()
+        self.unwritten_lock = threading.Lock()
+        # Per-topic rolling windows, built from the store on first use
+        self._windows = None
+        self._windows_size = None
+        # Attempts counted in the windows but not written yet, which a snapshot must not include
+        self._unwritten = 0
         
     def load_data(self):
-        try:
-            with open(self.filename, 'r') as f:
-                reader = csv.DictReader(f)
-                return list(reader)
-        except FileNotFoundError:
-            return []
+        """
+        The full attempt history as an AttemptHistory. Indexing or iterating it
+        yields read-only dict-like rows with the same keys and string values as the CSV.
+        """
+        # The first load parses the file, which mustn't miss a row appended meanwhile
+        with self.store_lock:
+            return self.store.load()
+
+    def load_attempts_between(self, start=None, end=None, topic=None):
+        """Attempts with start <= date <= end (datetimes or date strings), optionally for one topic"""
+        with self.store_lock:
+            return self.store.between(start, end, topic)
 
     def save_attempt(self, topic, difficulty, correct):
-        csv_path = resource_path(self.filename)
-        data = self.load_data()
+        self.save_attempts([(topic, difficulty, correct)])
+
+    def save_attempts(self, attempts):
+        """
+        Record many (topic, difficulty, correct) attempts with a single write.
+        All of them get the current timestamp.
+        """
+        new_attempts = self._new_attempts(attempts)
+        if not new_attempts:
+            return
+        with self.store_lock:
+            self.store.append(new_attempts)
+        self._index_attempts(new_attempts)
+
+    def record_attempts(self, attempts):
+        """
+        Like save_attempts, but only counts the attempts towards the scores.
+        Returns them as an AttemptHistory to be passed to write_attempts,
+        which can be done later or from another thread.
+        """
+        # Build the windows now, or the attempts would be missed until they are written
+        self._get_windows()
+        new_attempts = self._new_attempts(attempts)
+        self._index_attempts(new_attempts)
+        with self.unwritten_lock:
+            self._unwritten += len(new_attempts)
+        return new_attempts
+
+    def write_attempts(self, attempts):
+        """Store an AttemptHistory of attempts from record_attempts; safe to call from a background thread"""
+        if not attempts:
+            return
+        with self.store_lock:
+            self.store.append(attempts)
+        with self.unwritten_lock:
+            self._unwritten -= len(attempts)
+
+    def _new_attempts(self, attempts):
+        date = datetime.now().replace(microsecond=0)
+        new_attempts = AttemptHistory()
+        for topic, difficulty, correct in attempts:
+            new_attempts.append(topic, difficulty, correct, date)
+        return new_attempts
+
+    def compact(self, keep_last=None):
+        """
+        Tidy the stored history, dropping rows torn by crashes.
+        If keep_last is given, only the most recent keep_last attempts per topic are kept.
+        """
+        with self.store_lock:
+            kept = self.store.compact(keep_last=keep_last)
+        self._windows = None
+        return kept
+
+    def _index_attempts(self, attempts):
+        """Feed new attempts into the rolling windows if they have been built"""
+        if self._windows is None:
+            return
+        # Look windows up by the history's topic ids so each name is hashed once
+        windows_by_id = []
+        for topic in attempts.topics:
+            window = self._windows.get(topic)
+            if window is None:
+                window = self._windows[topic] = TopicWindow(self.window_size)
+            windows_by_id.append(window)
         
-        attempt = {
-            'topic': topic,
-            'difficulty': difficulty,
-            'correct': correct,
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for topic_id, outcome in zip(attempts.topic_ids, attempts.outcomes):
+            windows_by_id[topic_id].add(outcome)
+
+    def _get_windows(self):
+        # Rebuild if the window size was changed since the index was built,
+        # or if another app instance has written to a shared database.
+        # The store lock is only needed to ask the store, which a write in progress holds up.
+        if self._windows is not None and self._windows_size == self.window_size and not self.store.shared:
+            return self._windows
+        with self.store_lock:
+            if (self._windows is None or self._windows_size != self.window_size
+                    or self.store.has_external_changes()):
+                self._build_windows()
+        return self._windows
+
+    def _build_windows(self):
+        """Windows from the snapshot plus the attempts stored since, or else from the history"""
+        self._windows = {}
+        self._windows_size = self.window_size
+        snapshot = self._load_snapshot()
+        new_attempts = self.store.read_since(snapshot['position']) if snapshot is not None else None
+        if new_attempts is None:
+            self._index_attempts(self.store.recent(self.window_size))
+        else:
+            for topic, outcomes in snapshot['windows'].items():
+                window = self._windows[topic] = TopicWindow(self.window_size)
+                for outcome in outcomes:
+                    window.add(outcome)
+            self._index_attempts(new_attempts)
+        if new_attempts is None or new_attempts:
+            self._save_snapshot()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if snapshot.get('window_size') != self.window_size:
+            return None
+        return snapshot
+
+    def _save_snapshot(self):
+        # Only the outcome codes are kept, the sums are redone on load so changing SCORES is fine
+        position = self.store.position()
+        if position is None or self._unwritten:
+            return
+        snapshot = {
+            'window_size': self._windows_size,
+            'position': position,
+            'windows': {topic: list(window.attempts) for topic, window in self._windows.items()}
         }
-        
-        data.append(attempt)
-        
-        with open(csv_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['topic', 'difficulty', 'correct', 'date'])
-            writer.writeheader()
-            writer.writerows(data)
+        tmp_path = self.snapshot_file + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_file)
+        except OSError:
+            pass  # A read-only install just replays more attempts next time
+
+    def save_snapshot(self):
+        """Save the windows so the next start only replays later attempts; call once everything is written"""
+        with self.store_lock:
+            if self._windows is not None:
+                self._save_snapshot()
 
     def calculate_knowledge(self, topic):
-        data = self.load_data()
-        topic_attempts = [d for d in data if d['topic'] == topic][-self.window_size:]
-        
-        if not topic_attempts:
+        window = self._get_windows().get(topic)
+        if window is None:
             return 0
-                
-        scores = {
-            'e': {'wrong': -3, 'right': 1},
-            'm': {'wrong': -2, 'right': 2}, 
-            'h': {'wrong': -1, 'right': 3}
-        }
-        
-        total_score = 0
-        actual_max_possible = 0
-        actual_min_possible = 0
-        
-        for attempt in topic_attempts:
-            diff = attempt['difficulty']
-            correct = attempt['correct'] == 'True'
-            score_type = 'right' if correct else 'wrong'
-            
-            # Add the actual score
-            total_score += scores[diff][score_type]
-            
-            # Calculate the actual maximum and minimum possible for this attempt
-            actual_max_possible += scores[diff]['right']
-            actual_min_possible += scores[diff]['wrong']
-        
-        # Normalize to 0-100 scale
-        score_range = actual_max_possible - actual_min_possible
-        if score_range == 0:
-            return 50
-        
-        normalized_score = ((total_score - actual_min_possible) / score_range) * 100
+        return window.score()
+
+    def calculate_all_knowledge(self, topics=None):
+        """
+        Scores for every topic with recorded attempts, or for the given topics,
+        as a {topic: score} dict. The history is only read once for all of them.
+        """
+        windows = self._get_windows()
+        if topics is None:
+            topics = windows.keys()
+        return {topic: windows[topic].score() if topic in windows else 0 for topic in topics}
+
+    def calculate_trajectories(self, topics=None, window_size=None, scores=None):
+        """
+        Knowledge score after every attempt, as {topic: (timestamps, scores)} NumPy arrays.
+        window_size and scores (a table shaped like SCORES) default to the tracker's own rules.
+        """
+        # NumPy is only needed here, so the rest of the tracker works without it
+        from ScoringEngine import ScoringEngine
         
-        return round(normalized_score)
+        engine = ScoringEngine(window_size or self.window_size, scores)
+        return engine.trajectories(self.load_data(), topics)
 
     def generate_synthetic_data(self, topic, scores):
         """
@@ -137,5 +323,31 @@ class SkillTracker:
         random.shuffle(results)
         
         # Save attempts
-        for difficulty, correct in results:
-            self.save_attempt(topic, difficulty, str(correct))
\ No newline at end of file
+        self.save_attempts((topic, difficulty, str(correct)) for difficulty, correct in results)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Maintenance commands for the skill data file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    compact_parser = subparsers.add_parser('compact', help="Tidy the data file, dropping torn rows")
+    compact_parser.add_argument('--file', default='skill_data.csv')
+    compact_parser.add_argument('--backend', choices=sorted(STORES), default='csv')
+    compact_parser.add_argument('--keep-last', type=int, default=None,
+                                help="Only keep the most recent N attempts per topic")
+    
+    import_parser = subparsers.add_parser('import-csv', help="Copy a CSV history into a new SQLite database")
+    import_parser.add_argument('--csv', default='skill_data.csv')
+    import_parser.add_argument('--db', default='skill_data.db')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'compact':
+        tracker = SkillTracker(filename=args.file, backend=args.backend)
+        kept = tracker.compact(keep_last=args.keep_last)
+        print(f"Compacted {tracker.filename}: {kept} attempts kept")
+    elif args.command == 'import-csv':
+        tracker = SkillTracker(filename=args.db, backend='sqlite')
+        imported = tracker.store.import_csv(resource_path(args.csv))
+        print(f"Imported {imported} attempts into {tracker.filename}")
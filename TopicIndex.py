@@ -0,0 +1,65 @@
+import difflib
+import re
+
+GRAM_SIZE = 3  # Length of the pieces of topic names that are indexed
+FUZZY_CUTOFF = 0.75  # How close (0-1) a misspelt word must be to a word in a topic name
+
+def words(text):
+    return re.findall(r"\w+", text.lower())
+
+class TopicIndex:
+    """
+    Search index over topic names. Every piece of up to GRAM_SIZE characters of
+    the lowercase "Category/Skill" name is indexed, so only the names that have
+    all the pieces of the search text need the full substring test, however
+    many topics there are.
+    """
+    def __init__(self, topics):
+        self.topics = list(topics)
+        self.lower_names = [topic.lower() for topic in self.topics]
+        self.grams = {}  # piece of a name -> positions of the topics containing it
+        self.word_positions = {}  # word of a name -> positions of the topics with that word
+        for i, name in enumerate(self.lower_names):
+            for start in range(len(name)):
+                for end in range(start + 1, min(start + GRAM_SIZE, len(name)) + 1):
+                    self.grams.setdefault(name[start:end], set()).add(i)
+            for word in set(words(name)):
+                self.word_positions.setdefault(word, set()).add(i)
+        self.words = sorted(self.word_positions)
+
+    def _containing(self, text):
+        if len(text) <= GRAM_SIZE:
+            return set(self.grams.get(text, ()))
+        candidates = None
+        for start in range(len(text) - GRAM_SIZE + 1):
+            positions = self.grams.get(text[start:start + GRAM_SIZE], set())
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return set()
+        return {i for i in candidates if text in self.lower_names[i]}
+
+    def _close_words(self, word):
+        positions = set()
+        for close in difflib.get_close_matches(word, self.words, n=5, cutoff=FUZZY_CUTOFF):
+            positions |= self.word_positions[close]
+        return positions
+
+    def search(self, text, fuzzy=False):
+        """
+        Topics whose names contain the search text, as a set. With fuzzy=True and
+        no such names, the names with words spelt like every word searched for.
+        """
+        text = text.lower().strip()
+        if not text:
+            return set(self.topics)
+
+        matches = self._containing(text)
+        query_words = words(text)
+        if not matches and fuzzy and query_words:
+            matches = None
+            for word in query_words:
+                positions = self._close_words(word)
+                matches = positions if matches is None else matches & positions
+                if not matches:
+                    break
+        return {self.topics[i] for i in matches}
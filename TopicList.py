@@ -0,0 +1,140 @@
+import math
+import tkinter as tk
+
+ROW_PADDING = 5
+DIFFICULTIES = [('e', 'green'), ('m', 'orange'), ('h', 'red')]
+
+class TopicRow:
+    """The widgets of one row: the topic's frame, score label and buttons. Rows are reused for other topics."""
+    def __init__(self, parent, on_attempt, on_practice):
+        self.topic = None
+        self.score_text = None
+        self.frame = tk.LabelFrame(parent, text="")
+        self.score_label = tk.Label(self.frame, text="")
+        self.score_label.pack()
+
+        button_frame = tk.Frame(self.frame)
+        button_frame.pack(pady=5)
+        for diff, color in DIFFICULTIES:
+            wrong_btn = tk.Button(button_frame, text=f"{diff.title()} -", bg=color,
+                                  command=lambda d=diff: on_attempt(self.topic, d, False))
+            wrong_btn.pack(side=tk.LEFT, padx=5)
+
+            right_btn = tk.Button(button_frame, text=f"{diff.title()} +", bg=color,
+                                  command=lambda d=diff: on_attempt(self.topic, d, True))
+            right_btn.pack(side=tk.LEFT, padx=5)
+
+        def show_difficulty_menu():
+            menu = tk.Menu(self.frame, tearoff=0)
+            for diff, _ in DIFFICULTIES:
+                menu.add_command(label=diff.title(), command=lambda t=self.topic, d=diff: on_practice(t, d))
+            menu.post(button_frame.winfo_pointerx(), button_frame.winfo_pointery())
+
+        practice_btn = tk.Button(button_frame, text="Practice", command=show_difficulty_menu)
+        practice_btn.pack(side=tk.LEFT, padx=5)
+
+    def bind(self, topic, score_text):
+        self.topic = topic
+        self.score_text = score_text
+        self.frame.config(text=topic)
+        self.score_label.config(text=score_text)
+
+    def flash(self):
+        """Flash the score label briefly to indicate an update"""
+        original_bg = self.score_label.cget("background")
+        self.score_label.config(background="yellow")
+        self.score_label.after(500, lambda: self.score_label.config(background=original_bg))
+
+class TopicList:
+    """
+    Scrollable list of topics that only has widgets for the rows on screen.
+    All rows are the same height, so the rows in view follow from the scroll
+    position; scrolling or resizing moves the existing row widgets and rebinds
+    them to other topics instead of creating new ones.
+    """
+    def __init__(self, parent, on_attempt, on_practice):
+        self.on_attempt = on_attempt
+        self.on_practice = on_practice
+        self.score_texts = {}  # topic -> text of its score label
+        self.topics = []  # Every topic, in display order
+        self.shown = []  # The topics that pass the current filter
+        self.rows = []  # (TopicRow, canvas window item) pool, one per row on screen
+        self.row_height = None
+
+        self.canvas = tk.Canvas(parent)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
+        self.scrollbar = tk.Scrollbar(parent, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Every change of the view goes through here, however it was scrolled
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.bind('<Configure>', self.on_canvas_configure)
+
+    def set_topics(self, topics, score_texts):
+        self.topics = list(topics)
+        self.score_texts = dict(score_texts)
+        self.show(self.topics)
+
+    def show(self, topics):
+        """Display only these topics, in this order"""
+        self.shown = list(topics)
+        if self.row_height is None and self.shown:
+            self._add_row()
+            self.rows[0][0].frame.update_idletasks()
+            self.row_height = self.rows[0][0].frame.winfo_reqheight() + 2 * ROW_PADDING
+        height = len(self.shown) * (self.row_height or 0)
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+        self.render()
+
+    def set_score_text(self, topic, text):
+        """Change one topic's score label, in place if it is on screen; returns its row or None"""
+        self.score_texts[topic] = text
+        for row, _ in self.rows:
+            if row.topic == topic:
+                row.score_text = text
+                row.score_label.config(text=text)
+                return row
+        return None
+
+    def _add_row(self):
+        row = TopicRow(self.canvas, self.on_attempt, self.on_practice)
+        item = self.canvas.create_window(ROW_PADDING, 0, window=row.frame, anchor='nw',
+                                         width=max(self.canvas.winfo_width() - 2 * ROW_PADDING, 1), state='hidden')
+        self.rows.append((row, item))
+
+    def render(self):
+        if not self.row_height:
+            return
+        first = int(self.canvas.canvasy(0) // self.row_height)
+        visible = math.ceil(self.canvas.winfo_height() / self.row_height) + 1
+        while len(self.rows) < min(visible, len(self.shown)):
+            self._add_row()
+
+        # Row i of the list always goes to the same slot, so rows still in view after a scroll keep their topic
+        used = set()
+        for index in range(first, min(first + visible, len(self.shown))):
+            slot = index % len(self.rows)
+            used.add(slot)
+            row, item = self.rows[slot]
+            topic = self.shown[index]
+            score_text = self.score_texts.get(topic, "")
+            # Rebind if the row shows another topic or an old score, e.g. after set_topics
+            if row.topic != topic or row.score_text != score_text:
+                row.bind(topic, score_text)
+            self.canvas.coords(item, ROW_PADDING, index * self.row_height + ROW_PADDING)
+            self.canvas.itemconfigure(item, state='normal')
+
+        for slot, (row, item) in enumerate(self.rows):
+            if slot not in used:
+                row.topic = None
+                self.canvas.itemconfigure(item, state='hidden')
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.render()
+
+    def on_canvas_configure(self, event):
+        """Make the rows the same width as the canvas and fill its new height"""
+        for _, item in self.rows:
+            self.canvas.itemconfigure(item, width=max(event.width - 2 * ROW_PADDING, 1))
+        self.canvas.configure(scrollregion=(0, 0, event.width, len(self.shown) * (self.row_height or 0)))
+        self.render()
@@ -1,8 +1,18 @@
+import argparse
 import json
 import random
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import anthropic
+from BatchSizer import BatchSizer
+from DuplicateIndex import DuplicateIndex, question_text
+from ExampleStore import ExampleStore
+from FakeClient import FakeClient
+from GenerationRun import GenerationRun, read_jsonl, write_json_atomic
+from QuestionManager import QuestionManager, question_id
+from RequestScheduler import RequestScheduler
+from ResponseCache import ResponseCache
 
 # User Configuration 
 API_KEY = 'your_anthropic_api_key'
@@ -11,22 +21,33 @@ TOPIC_NAME = "Name of a topic you want to generate questions for"
 NUM_QUESTIONS_TO_GENERATE = 12
 
 QUESTIONS_OUTPUT_FILE = 'questions.json'
+STAGING_FILE = 'generation_staging.jsonl'  # Accepted questions of the current run, merged into the bank at the end
+CHECKPOINT_FILE = 'generation_checkpoint.json'  # Progress of the current run, for --resume
 QUESTIONS_SEPARATOR = "\n\n"
 MODEL_NAME = "claude-3-7-sonnet-20250219"  # Use the appropriate Claude model
 REASONING_MODEL_NAME = "claude-3-7-sonnet-20250219"  # Use a suitable Claude model for reasoning
-BATCH_SIZE = 4  # Number of questions to validate in one batch
+DIFFICULTIES = ['e', 'm', 'h']
+BATCH_SIZE = 4  # Number of questions to validate in one batch to start with
+MIN_BATCH_SIZE = 1  # Batch size is adapted within these bounds to how well the validator copes
+MAX_BATCH_SIZE = 8
 NUM_EXAMPLES_PER_GENERATION = 3
+EXAMPLE_TOKEN_BUDGET = 1500  # Most prompt tokens the examples may take up
+EXAMPLE_CACHE_DIR = '.example_cache'  # Cleaned example files, rebuilt when the files change
+CONCURRENCY = 4  # Maximum number of API requests in flight at once
+REQUESTS_PER_MINUTE = 50  # Your API rate limits
+TOKENS_PER_MINUTE = 40000
+MAX_RETRIES = 5  # Retries with backoff for rate limits, overload and connection errors
+VALIDATION_RETRIES = 2  # Times to ask again about questions whose answers couldn't be parsed
+MAX_CONSECUTIVE_FAILURES = 10  # Give up if this many generations in a row fail or are duplicates
+CACHE_DIR = '.response_cache'  # Model responses saved for reruns, see --no-cache
+CACHE_MAX_MB = 100
+DUPLICATE_THRESHOLD = 0.7  # Similarity (0-1) of passage + prompt above which a question is a duplicate
+REVALIDATION_REPORT_FILE = 'revalidation_report.json'
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(api_key=API_KEY)
+# Marks a validation answer that couldn't be read, as opposed to an INVALID question
+UNPARSED = object()
 
-def batch_validate_answers(question_data_list, topic):
-    """
-    Validate multiple generated questions in a single API call
-    """
-    if not question_data_list:
-        return []
-    
+def build_validation_prompt(question_data_list, topic):
     validation_prompt = f"""I need you to solve multiple SAT questions on the topic of {topic}. For each question, provide ONLY the single digit number (0, 1, 2, or 3) of the correct answer.
 If none of the answers fit or make sense, or the question is not answerable or relevant to the topic of {topic}, respond with "INVALID" for that question.
 
@@ -50,7 +71,34 @@ Choices:
 3. {question_data['choices'][3]}
 
 """
+    return validation_prompt
+
+def parse_validation_response(result_text, num_questions):
+    """
+    One entry per question: the answer index, None for INVALID, or UNPARSED if
+    the answer could not be read. If the model gave the wrong number of answers
+    there is no telling which answer belongs to which question, so all are UNPARSED.
+    """
+    answer_texts = "".join(result_text.split()).split(',')
+    if len(answer_texts) != num_questions:
+        return [UNPARSED] * num_questions
+    
+    results = []
+    for answer_text in answer_texts:
+        if answer_text == 'INVALID':
+            results.append(None)
+        elif answer_text in ('0', '1', '2', '3'):
+            results.append(int(answer_text))
+        else:
+            results.append(UNPARSED)
+    return results
 
+def request_validation(client, question_data_list, topic, batch_sizer=None):
+    """
+    Validate multiple generated questions in a single API call, telling
+    batch_sizer how well it went
+    """
+    started = time.monotonic()
     try:
         response = client.messages.create(
             model=REASONING_MODEL_NAME,
@@ -60,37 +108,56 @@ Choices:
                 "type": "enabled",
                 "budget_tokens": 1024
             },
-            messages=[{"role": "user", "content": validation_prompt}]
+            messages=[{"role": "user", "content": build_validation_prompt(question_data_list, topic)}]
         )
         result_text = response.content[1].text.strip()
         print(f"Batch validation response: {result_text}")
-        
-        # Parse the comma-separated results
-        results = []
-        answer_texts = result_text.replace(" ", "").split(',')
-        
-        for answer_text in answer_texts:
-            if answer_text == 'INVALID':
-                results.append(None)
-            else:
-                try:
-                    results.append(int(answer_text))
-                except ValueError:
-                    results.append(None)
-        
-        # If we didn't get enough results, pad with None
-        while len(results) < len(question_data_list):
-            results.append(None)
-            
-        # If we got too many results, trim the excess
-        if len(results) > len(question_data_list):
-            results = results[:len(question_data_list)]
-            
-        return results
+        answers = parse_validation_response(result_text, len(question_data_list))
         
     except Exception as e:
         print(f"Batch validation error: {str(e)}")
-        return [None] * len(question_data_list)
+        return [UNPARSED] * len(question_data_list)
+    
+    if batch_sizer is not None:
+        usage = getattr(response, 'usage', None)
+        tokens = usage.input_tokens + usage.output_tokens if usage is not None else 0
+        parsed = sum(answer is not UNPARSED for answer in answers)
+        batch_sizer.record(len(question_data_list), parsed, time.monotonic() - started, tokens)
+    return answers
+
+def batch_validate_answers(client, question_data_list, topic, batch_sizer=None):
+    """
+    Validate multiple generated questions, asking again only about the ones whose
+    answers could not be parsed, in smaller batches each time and one at a
+    time on the last try. Returns the correct answer index for each question,
+    None if it is invalid, or UNPARSED if it never got a readable answer.
+    Only the first request is reported to batch_sizer: retries are of questions
+    that already failed to parse and would make their smaller sizes look worse than they are.
+    Pass batch_sizer=None for batches that aren't of the size it asked for.
+    """
+    results = [UNPARSED] * len(question_data_list)
+    pending = list(range(len(question_data_list)))
+    
+    for attempt in range(VALIDATION_RETRIES + 1):
+        if not pending:
+            break
+        if attempt > 0:
+            print(f"Retrying validation for {len(pending)} unparsed questions...")
+        
+        chunk_size = 1 if attempt == VALIDATION_RETRIES else max(1, len(pending) >> attempt)
+        still_pending = []
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            answers = request_validation(client, [question_data_list[i] for i in chunk], topic,
+                                         batch_sizer if attempt == 0 else None)
+            for i, answer in zip(chunk, answers):
+                if answer is UNPARSED:
+                    still_pending.append(i)
+                else:
+                    results[i] = answer
+        pending = still_pending
+    
+    return results
 
 def generate_question(client, examples, example_text, topic):
     """
@@ -125,23 +192,8 @@ Provide only the JSON output, with no additional text or explanation. Always set
         print(f"Question generation error: {str(e)}")
         return None
 
-def main():
-    # Read existing JSON file
-    try:
-        with open(QUESTIONS_OUTPUT_FILE, 'r') as json_file:
-            all_data = json.load(json_file)
-    except FileNotFoundError:
-        all_data = {}
-
-    # Read the input data file
-    with open(INPUT_DATA_FILE, 'r') as file:
-        text = file.read()
-
-    # Split on double newlines
-    chunks = text.split(QUESTIONS_SEPARATOR)
-
-    # Example JSON text
-    example_text = """{
+# Example JSON text
+EXAMPLE_TEXT = """{
     "passage": "Passage",
     "prompt": "The question?",
     "choices": [
@@ -154,71 +206,426 @@ def main():
     "used": false
     }"""
 
-    # Ensure topic exists in all_data
-    topic = TOPIC_NAME
-    if topic not in all_data:
-        all_data[topic] = {"e": [], "m": [], "h": []}
-
-    # Generate questions
-    generated_questions = 0
-    questions_to_validate = []
-    
-    while generated_questions < NUM_QUESTIONS_TO_GENERATE:
-        # Generate questions until we have enough for a batch or met our target
-        while len(questions_to_validate) < BATCH_SIZE and generated_questions + len(questions_to_validate) < NUM_QUESTIONS_TO_GENERATE:
-            # Randomly sample examples
-            example_chunks = random.sample(chunks, min(NUM_EXAMPLES_PER_GENERATION, len(chunks)))
-            examples = "\n\nExample 1:\n" + example_chunks[0]
-            if len(example_chunks) > 1:
-                examples += "\n\nExample 2:\n" + example_chunks[1]
-            if len(example_chunks) > 2:
-                examples += "\n\nExample 3:\n" + example_chunks[2]
-
-            # Generate question
-            response_text = generate_question(client, examples, example_text, topic)
-            
-            if not response_text:
-                print("Failed to generate question. Trying again...")
-                continue
-
-            try:
-                # Parse the generated question
-                question_data = json.loads(response_text)
-                questions_to_validate.append(question_data)
-                print(f"Generated question {len(questions_to_validate)}, waiting for batch validation")
-                
-            except json.JSONDecodeError:
-                print("Failed to parse JSON for question")
-                continue
-        
-        # Validate batch of questions
-        if questions_to_validate:
-            print(f"Validating batch of {len(questions_to_validate)} questions...")
-            validation_results = batch_validate_answers(questions_to_validate, topic)
+def sample_examples(examples):
+    """Indices of randomly sampled example questions that fit in EXAMPLE_TOKEN_BUDGET"""
+    return examples.sample(NUM_EXAMPLES_PER_GENERATION, EXAMPLE_TOKEN_BUDGET)
+
+def format_examples(examples, indices):
+    """Lay out the sampled examples for the generation prompt"""
+    return "".join(f"\n\nExample {i}:\n{examples.texts[index]}" for i, index in enumerate(indices, 1))
+
+def parse_question(response_text):
+    if not response_text:
+        print("Failed to generate question. Trying again...")
+        return None
+    try:
+        question = json.loads(response_text)
+    except json.JSONDecodeError:
+        print("Failed to parse JSON for question")
+        return None
+    # Valid JSON isn't necessarily a question; everything downstream expects these fields
+    if (not isinstance(question, dict) or not isinstance(question.get('passage'), str)
+            or not isinstance(question.get('prompt'), str)
+            or not isinstance(question.get('choices'), list) or len(question['choices']) != 4):
+        print("Generated JSON is not a question with a passage, a prompt and 4 choices")
+        return None
+    return question
+
+def generation_task(topic, difficulty, examples, num_questions, on_valid, pending=None, on_pending=None, duplicates=None, pool=0):
+    """
+    State of one topic and difficulty being generated by generate_tasks.
+    pool is how many unused questions the bank already has for it, to
+    decide which task gets the next free request.
+    """
+    return {
+        'topic': topic, 'difficulty': difficulty, 'examples': examples, 'target': num_questions, 'on_valid': on_valid,
+        'on_pending': on_pending, 'duplicates': duplicates, 'pool': pool,
+        'accepted': 0, 'failures': 0, 'candidates': list(pending or []),
+        'generating': 0, 'validating': 0, 'gave_up': False
+    }
+
+def task_name(task):
+    return f"{task['topic']} ({task['difficulty']})"
+
+def in_flight(task):
+    """Questions of the task that may still be accepted"""
+    return task['generating'] + len(task['candidates']) + task['validating']
+
+def generate_tasks(client, tasks, example_text, concurrency=CONCURRENCY, batch_sizer=None):
+    """
+    Generate and validate questions for every task (see generation_task) with
+    up to `concurrency` API requests in flight between them. Each free request
+    goes to the task with the fewest questions counting its pool and what it
+    has accepted or has in flight, so the emptiest pools fill up first.
+    A validation batch is sent as soon as batch_sizer.size of a task's
+    candidates are ready while generation carries on.
+    on_valid(questions) is called from this thread with each batch of accepted
+    questions. Candidates are {question, examples} dicts, examples being the
+    indices of the task's examples (an ExampleStore) they were generated from; pending candidates (e.g. from
+    a checkpoint) are validated first, and on_pending(candidates) is told every
+    time the set of generated-but-unvalidated candidates changes.
+    Candidates that are near-duplicates of a question in the `duplicates` index
+    are dropped before validation; new candidates are added to it.
+    A task that fails MAX_CONSECUTIVE_FAILURES generations in a row is given up
+    on, with its 'gave_up' set, and the others carry on.
+    """
+    batch_sizer = batch_sizer or BatchSizer(BATCH_SIZE)
+    generating = {}  # future -> (task, example indices it was generated from)
+    validating = {}  # future -> (task, batch of candidates being validated)
+    
+    def report_pending(task):
+        if task['on_pending']:
+            batches = [batch for other, batch in validating.values() if other is task]
+            task['on_pending'](task['candidates'] + [c for batch in batches for c in batch])
+    
+    def open_tasks():
+        # Count every question that may still be accepted so we never overshoot a target
+        return [task for task in tasks
+                if not task['gave_up'] and task['accepted'] + in_flight(task) < task['target']]
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            while len(generating) + len(validating) < concurrency:
+                candidates_for_slot = open_tasks()
+                if not candidates_for_slot:
+                    break
+                task = min(candidates_for_slot, key=lambda t: t['pool'] + t['accepted'] + in_flight(t))
+                examples = sample_examples(task['examples'])
+                future = executor.submit(generate_question, client, format_examples(task['examples'], examples),
+                                         example_text, task['topic'])
+                generating[future] = (task, examples)
+                task['generating'] += 1
             
-            # Process validation results
-            valid_questions = []
-            for i, (question, result) in enumerate(zip(questions_to_validate, validation_results)):
-                if result is not None:
-                    # Update the correct answer in the question data
-                    question['correct_answer'] = result
-                    valid_questions.append(question)
-                    generated_questions += 1
-                else:
-                    print(f"Question {i+1} in batch is invalid, skipping")
+            # Send full batches, or what is left once nothing more is being generated
+            batch_size = batch_sizer.size
+            for task in tasks:
+                while len(task['candidates']) >= batch_size or (task['candidates'] and not task['generating']):
+                    batch, task['candidates'] = task['candidates'][:batch_size], task['candidates'][batch_size:]
+                    print(f"Validating batch of {len(batch)} questions for {task_name(task)}...")
+                    questions = [candidate['question'] for candidate in batch]
+                    # A leftover partial batch says little about how its size does
+                    sizer = batch_sizer if len(batch) == batch_size else None
+                    future = executor.submit(batch_validate_answers, client, questions, task['topic'], sizer)
+                    validating[future] = (task, batch)
+                    task['validating'] += len(batch)
             
-            # Add valid questions to all_data
-            all_data[topic]["h"].extend(valid_questions)
+            if not generating and not validating:
+                break
             
-            # Write the updated data
-            with open(QUESTIONS_OUTPUT_FILE, 'w') as json_file:
-                json.dump(all_data, json_file, indent=2)
-                print(f"Added {len(valid_questions)} questions to the JSON file")
+            done, _ = wait(set(generating) | set(validating), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in generating:
+                    task, examples = generating.pop(future)
+                    task['generating'] -= 1
+                    duplicates = task['duplicates']
+                    question_data = parse_question(future.result())
+                    if question_data is not None and duplicates is not None:
+                        if duplicates.find_duplicate(question_text(question_data)) is not None:
+                            print("Generated question is a near-duplicate, skipping")
+                            question_data = None
+                        else:
+                            duplicates.add(question_id(question_data), question_text(question_data))
+                    if question_data is None:
+                        task['failures'] += 1
+                        if task['failures'] >= MAX_CONSECUTIVE_FAILURES and not task['gave_up']:
+                            print(f"Giving up on {task_name(task)} after {task['failures']} failed generations in a row")
+                            task['gave_up'] = True
+                        continue
+                    task['failures'] = 0
+                    task['candidates'].append({'question': question_data, 'examples': examples})
+                    print(f"Generated question {len(task['candidates'])} for {task_name(task)}, waiting for batch validation")
+                    report_pending(task)
+                    continue
+                
+                task, batch = validating.pop(future)
+                task['validating'] -= len(batch)
+                valid_questions = []
+                for i, (candidate, result) in enumerate(zip(batch, future.result())):
+                    if result is not None and result is not UNPARSED:
+                        # Update the correct answer in the question data
+                        question = candidate['question']
+                        question['correct_answer'] = result
+                        question['id'] = question_id(question)
+                        valid_questions.append(question)
+                    else:
+                        print(f"Question {i+1} in batch is invalid, skipping")
+                        if task['duplicates'] is not None:
+                            # Don't let a rejected question block similar ones that may be valid
+                            task['duplicates'].remove(question_id(candidate['question']))
+                
+                task['accepted'] += len(valid_questions)
+                task['on_valid'](valid_questions)
+                report_pending(task)
+    
+    return tasks
+
+def build_duplicate_index(bank_file, run, topic):
+    """Index every question the topic already has: in the bank, staged by this run or pending validation"""
+    duplicates = DuplicateIndex(DUPLICATE_THRESHOLD)
+    try:
+        with open(bank_file, 'r') as f:
+            bank = json.load(f)
+    except FileNotFoundError:
+        bank = {}
+    
+    questions = [q for difficulty_questions in bank.get(topic, {}).values() for q in difficulty_questions]
+    questions += [record['question'] for record in read_jsonl(run.staging_file) if record['topic'] == topic]
+    questions += [candidate['question'] for job in run.jobs if job['topic'] == topic for candidate in job['pending']]
+    for question in questions:
+        duplicates.add(question_id(question), question_text(question))
+    return duplicates
+
+def revalidation_batches(bank, topics, batch_sizer):
+    """
+    Stream (topic, difficulty, questions, full) batches of the bank's questions,
+    each as big as batch_sizer says at the time, full being False for a shorter
+    one at the end of a list; batches never mix topics
+    """
+    for topic in topics:
+        for difficulty, questions in bank.get(topic, {}).items():
+            start = 0
+            while start < len(questions):
+                batch_size = batch_sizer.size
+                batch = questions[start:start + batch_size]
+                yield topic, difficulty, batch, len(batch) == batch_size
+                start += batch_size
+
+def revalidate_questions(client, bank, topics, on_result, concurrency=CONCURRENCY, batch_sizer=None):
+    """
+    Ask the validator again about every stored question of the topics, with up
+    to `concurrency` batches in flight. on_result(topic, difficulty, question, answer)
+    is called from this thread for each question, answer being what
+    batch_validate_answers returned for it.
+    """
+    batch_sizer = batch_sizer or BatchSizer(BATCH_SIZE)
+    batches = revalidation_batches(bank, topics, batch_sizer)
+    validating = {}  # future -> (topic, difficulty, questions)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while True:
+            # Only keep a few batches queued, so big banks aren't all submitted up front
+            while len(validating) < concurrency * 2:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                topic, difficulty, questions, full = batch
+                future = executor.submit(batch_validate_answers, client, questions, topic, batch_sizer if full else None)
+                validating[future] = (topic, difficulty, questions)
+            if not validating:
+                break
             
-            # Clear the batch
-            questions_to_validate = []
+            done, _ = wait(validating, return_when=FIRST_COMPLETED)
+            for future in done:
+                topic, difficulty, questions = validating.pop(future)
+                for question, answer in zip(questions, future.result()):
+                    on_result(topic, difficulty, question, answer)
+
+def revalidate_bank(client, bank_file, topic, report_file, quarantine_file=None,
+                    concurrency=CONCURRENCY, batch_sizer=None):
+    """
+    Revalidate the questions of one topic, or of every topic if topic is None,
+    and write a JSON report of how the validator's answers compare with the stored
+    correct answers. Questions it disagrees with or calls invalid are listed in
+    quarantine_file, one id per line, if given.
+    """
+    with open(bank_file, 'r') as f:
+        bank = json.load(f)
+    if topic is None:
+        topics = list(bank)
+    elif topic in bank:
+        topics = [topic]
+    else:
+        raise ValueError(f"Topic {topic} is not in {bank_file}")
+    
+    summary = {t: {'agree': 0, 'disagree': 0, 'invalid': 0, 'unparsed': 0} for t in topics}
+    flagged = []
+    
+    def record_result(topic, difficulty, question, answer):
+        if answer is UNPARSED:
+            status = 'unparsed'
+        elif answer is None:
+            status = 'invalid'
+        elif answer == question['correct_answer']:
+            status = 'agree'
+        else:
+            status = 'disagree'
+        summary[topic][status] += 1
+        if status in ('disagree', 'invalid'):
+            flagged.append({
+                'id': question.get('id') or question_id(question),
+                'topic': topic,
+                'difficulty': difficulty,
+                'status': status,
+                'stored_answer': question['correct_answer'],
+                'validator_answer': answer
+            })
+    
+    revalidate_questions(client, bank, topics, record_result, concurrency=concurrency, batch_sizer=batch_sizer)
+    
+    write_json_atomic(report_file, {'summary': summary, 'flagged': flagged}, indent=2)
+    if quarantine_file:
+        with open(quarantine_file, 'w') as f:
+            f.writelines(f"{entry['id']}\n" for entry in flagged)
+    return summary, flagged
 
-    print(f"Added a total of {generated_questions} questions to the JSON file")
+def load_manifest(manifest_file):
+    """
+    Jobs listed in a manifest file: a JSON list of
+    {"topic": ..., "input": examples file, "difficulty": "e", "m" or "h", "target": count}
+    """
+    with open(manifest_file, 'r') as f:
+        jobs = json.load(f)
+    
+    seen = set()
+    for job in jobs:
+        missing = {'topic', 'input', 'difficulty', 'target'} - set(job)
+        if missing:
+            raise ValueError(f"Manifest job {job} is missing {', '.join(sorted(missing))}")
+        if job['difficulty'] not in DIFFICULTIES:
+            raise ValueError(f"Manifest job {job} has an unknown difficulty, use one of {', '.join(DIFFICULTIES)}")
+        # Staged questions are matched back to their job by topic and difficulty
+        key = (job['topic'], job['difficulty'])
+        if key in seen:
+            raise ValueError(f"Manifest lists {job['topic']} ({job['difficulty']}) more than once")
+        seen.add(key)
+    return jobs
+
+def load_examples(jobs):
+    """The ExampleStore of every example file the unfinished jobs use, by file name"""
+    examples_by_file = {}
+    for job in jobs:
+        if job.get('accepted', 0) < job['target'] and job['input'] not in examples_by_file:
+            examples_by_file[job['input']] = ExampleStore(job['input'], QUESTIONS_SEPARATOR, EXAMPLE_CACHE_DIR)
+    return examples_by_file
+
+def build_tasks(run, jobs, examples_by_file, bank_file):
+    """A generation task for every unfinished job of the run, sharing example files and duplicate indexes"""
+    question_manager = QuestionManager(bank_file)
+    duplicates_by_topic = {}
+    tasks = []
+    
+    for job in jobs:
+        if job['accepted'] >= job['target']:
+            continue
+        
+        if job['topic'] not in duplicates_by_topic:
+            duplicates_by_topic[job['topic']] = build_duplicate_index(bank_file, run, job['topic'])
+            print(f"Checking new {job['topic']} questions for duplicates "
+                  f"against {len(duplicates_by_topic[job['topic']])} existing ones")
+        
+        pool = question_manager.load_section(job['topic'], job['difficulty'])
+        
+        def save_valid_questions(valid_questions, job=job):
+            run.add_accepted(job, valid_questions)
+            print(f"Staged {len(valid_questions)} questions for {job['topic']} ({job['difficulty']}) "
+                  f"({job['accepted']}/{job['target']})")
+        
+        tasks.append(generation_task(
+            job['topic'], job['difficulty'], examples_by_file[job['input']], job['target'] - job['accepted'],
+            save_valid_questions,
+            pending=job['pending'], on_pending=lambda pending, job=job: run.set_pending(job, pending),
+            duplicates=duplicates_by_topic[job['topic']], pool=len(pool or ())
+        ))
+    return tasks
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate SAT questions with Claude")
+    parser.add_argument('command', nargs='?', choices=['generate', 'merge', 'revalidate'], default='generate',
+                        help="generate questions (default), merge an interrupted run's questions into the bank, "
+                             "or revalidate the questions already in the bank")
+    parser.add_argument('--input', default=INPUT_DATA_FILE, help="Text file with example questions for the topic")
+    parser.add_argument('--topic', default=None,
+                        help="Topic to generate for, or to revalidate (default: every topic)")
+    parser.add_argument('--count', type=int, default=NUM_QUESTIONS_TO_GENERATE, help="Number of questions to add")
+    parser.add_argument('--difficulty', choices=DIFFICULTIES, default='h')
+    parser.add_argument('--manifest', default=None,
+                        help="JSON file listing several jobs to run together instead of --topic/--input/--count")
+    parser.add_argument('--output', default=QUESTIONS_OUTPUT_FILE)
+    parser.add_argument('--resume', action='store_true', help="Continue the interrupted run from its checkpoint")
+    parser.add_argument('--staging', default=STAGING_FILE)
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="Maximum API requests in flight")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Questions per validation request to start with")
+    parser.add_argument('--min-batch-size', type=int, default=MIN_BATCH_SIZE)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE,
+                        help="Set both bounds to --batch-size to keep the batch size fixed")
+    parser.add_argument('--report', default=REVALIDATION_REPORT_FILE, help="Where revalidate writes its report")
+    parser.add_argument('--quarantine', default=None,
+                        help="File for revalidate to list the ids of questions that failed, one per line")
+    parser.add_argument('--rpm', type=int, default=REQUESTS_PER_MINUTE, help="Requests per minute allowed")
+    parser.add_argument('--tpm', type=int, default=TOKENS_PER_MINUTE, help="Tokens per minute allowed")
+    parser.add_argument('--offline', action='store_true', help="Use a local fake client instead of the API")
+    parser.add_argument('--no-cache', action='store_true', help="Always call the API instead of reusing cached responses")
+    parser.add_argument('--seed', type=int, default=None, help="Seed example sampling and replay cached responses, so a rerun repeats this one")
+    args = parser.parse_args()
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    run = GenerationRun(args.staging, args.checkpoint)
+    
+    if args.command == 'merge':
+        print(f"Added {run.merge(args.output)} questions to the JSON file")
+        return
+    
+    # Retries are left to the scheduler, which backs off across all threads
+    api_client = FakeClient() if args.offline else anthropic.Anthropic(api_key=API_KEY, max_retries=0)
+    client = RequestScheduler(args.rpm, args.tpm, max_retries=MAX_RETRIES).wrap(api_client)
+    if not args.no_cache:
+        # Cache hits skip the scheduler, so they don't count against the rate limits
+        # Without a seed a rerun is meant to get new samples, not the cached ones
+        client = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024, replay_samples=args.seed is not None).wrap(client)
+    batch_sizer = BatchSizer(args.batch_size, args.min_batch_size, args.max_batch_size)
+    
+    if args.command == 'revalidate':
+        summary, flagged = revalidate_bank(
+            client, args.output, args.topic, args.report, args.quarantine,
+            concurrency=args.concurrency, batch_sizer=batch_sizer
+        )
+        for topic, counts in summary.items():
+            print(f"{topic}: {counts['agree']} agree, {counts['disagree']} disagree, "
+                  f"{counts['invalid']} invalid, {counts['unparsed']} unparsed")
+        print(f"Flagged {len(flagged)} questions, see {args.report}")
+        return
+    
+    if args.resume:
+        if not os.path.exists(args.checkpoint):
+            print(f"No interrupted run to resume, {args.checkpoint} doesn't exist."
+                  + (" Add what was staged to the bank with the merge command." if run.exists() else ""))
+            return
+        jobs = run.resume()
+        for job in jobs:
+            print(f"Resuming: {job['accepted']} of {job['target']} questions already accepted "
+                  f"for {job['topic']} ({job['difficulty']})")
+    elif run.exists():
+        print(f"Found an interrupted run in {args.checkpoint}. Continue it with --resume, "
+              f"or add what it generated to the bank with the merge command.")
+        return
+    elif args.manifest:
+        jobs = load_manifest(args.manifest)
+    else:
+        jobs = [{'topic': args.topic or TOPIC_NAME, 'difficulty': args.difficulty, 'input': args.input,
+                 'target': args.count}]
+    
+    # Open the example files before a new run leaves a checkpoint behind
+    try:
+        examples_by_file = load_examples(jobs)
+    except OSError as e:
+        print(f"Can't read the example file {e.filename}: {e.strerror}")
+        return
+    except ValueError as e:
+        print(e)
+        return
+    if not args.resume:
+        jobs = run.start(jobs)
+    
+    tasks = build_tasks(run, jobs, examples_by_file, args.output)
+    generate_tasks(client, tasks, EXAMPLE_TEXT, concurrency=args.concurrency, batch_sizer=batch_sizer)
+    
+    unfinished = [task_name(task) for task in tasks if task['gave_up']]
+    if unfinished:
+        print(f"Gave up early on: {', '.join(unfinished)}")
+    print(f"Added a total of {run.merge(args.output)} questions to the JSON file")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,14 +1,18 @@
 from tkinter import messagebox
 import tkinter as tk
 from datetime import datetime
-import csv
 from SkillTracker import SkillTracker
 from QuestionManager import QuestionManager
+from TopicList import TopicList
+from TopicIndex import TopicIndex
+from BackgroundWriter import BackgroundWriter
 import random
 import time
+from collections import deque
 
 # User Configuration
-DATA_FILENAME = 'skill_data.csv'
+DATA_BACKEND = 'csv'  # 'csv' or 'sqlite' (run `python SkillTracker.py import-csv` once to convert)
+DATA_FILENAME = 'skill_data.csv'  # e.g. 'skill_data.db' with the sqlite backend
 QUESTIONS_FILENAME = 'questions.json'
 
 MIN_WINDOW_WIDTH = 600
@@ -19,6 +23,9 @@ MAX_TEXT_SIZE = 24
 QUESTION_WRAP_LENGTH = 1000
 CHOICE_WRAP_LENGTH = 1600
 PRACTICE_WINDOW_SIZE = "2000x2000"
+SEARCH_DELAY_MS = 150  # Wait for a pause in typing before filtering the topics
+FUZZY_SEARCH = True  # Also find topics when a word is misspelt
+PREFETCH_QUESTIONS = 3  # Questions kept shuffled and ready in the practice window
 
 WINDOW_TITLE = "Skill Tracker"
 
@@ -26,7 +33,12 @@ class SkillTrackerGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title(WINDOW_TITLE)
-        self.tracker = SkillTracker(filename=DATA_FILENAME)
+        self.tracker = SkillTracker(filename=DATA_FILENAME, backend=DATA_BACKEND)
+        # Shared by all practice windows; questions are only parsed for the topics practiced
+        self.question_manager = QuestionManager(questions_file=QUESTIONS_FILENAME)
+        # Attempts and used questions are written to disk on a worker thread
+        self.writer = BackgroundWriter(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.root.attributes('-topmost', True)
         
@@ -36,7 +48,9 @@ class SkillTrackerGUI:
         
         # Create search entry
         self.search_var = tk.StringVar()
-        self.search_var.trace_add('write', self.filter_topics)
+        self.search_var.trace_add('write', self.schedule_filter)
+        self.search_job = None
+        self.topic_index = TopicIndex([])
         self.search_entry = tk.Entry(self.search_frame, textvariable=self.search_var)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
@@ -48,139 +62,72 @@ class SkillTrackerGUI:
         self.main_frame = tk.Frame(self.root)
         self.main_frame.pack(fill=tk.BOTH, expand=1)
         
-        # Create canvas
-        self.canvas = tk.Canvas(self.main_frame)
-        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
-        
-        # Add scrollbar
-        self.scrollbar = tk.Scrollbar(self.main_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # Configure canvas
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        
-        # Create frame inside canvas for topics
-        self.topics_frame = tk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.topics_frame, anchor='nw')
+        # Scrollable list of topics, with widgets only for the rows on screen
+        self.topic_list = TopicList(self.main_frame, self.record_attempt, self.create_practice_window)
         
         # Update topics and create GUI elements
         self.update_topics()
         
-        # Configure scrolling
-        self.topics_frame.bind('<Configure>', self.on_frame_configure)
-        self.canvas.bind('<Configure>', self.on_canvas_configure)
-        
         # Set minimum window size
         self.root.minsize(MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT)
         
         self.root.mainloop()
+        self.writer.close()
+        
+    def on_close(self):
+        """Finish writing before the window goes away, then snapshot the scores for a quick next start"""
+        self.writer.close()
+        self.tracker.save_snapshot()
+        self.root.destroy()
+        
+    def on_write_done(self, error):
+        if error is not None:
+            messagebox.showerror("Save failed", f"Could not save your progress: {error}")
+        
+    def save_attempt(self, topic, difficulty, correct):
+        """Count the attempt towards the score now and write it in the background"""
+        attempts = self.tracker.record_attempts([(topic, difficulty, str(correct))])
+        self.writer.submit(self.tracker.write_attempts, attempts, self.on_write_done)
         
     def clear_search(self):
         """Clear the search entry"""
         self.search_var.set('')
         self.update_topics()
         
-    def filter_topics(self, *args):
-        """Filter topics based on search text"""
-        search_text = self.search_var.get().lower()
+    def schedule_filter(self, *args):
+        """Filter once typing pauses instead of on every keystroke"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.filter_topics)
         
-        # Show/hide frames based on search
-        for frame in self.topics_frame.winfo_children():
-            topic = frame.cget("text").lower()
-            if search_text in topic:
-                frame.pack(pady=5, padx=5, fill="x")
-            else:
-                frame.pack_forget()
-                
-    
-
-    def on_frame_configure(self, event=None):
-        """Reset the scroll region to encompass the inner frame"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-
-    def on_canvas_configure(self, event):
-        """Make the inner frame the same width as the canvas"""
-        width = event.width
-        self.canvas.itemconfig(self.canvas.create_window((0, 0), window=self.topics_frame, anchor='nw'), width=width)
+    def filter_topics(self):
+        """Filter topics based on search text"""
+        self.search_job = None
+        matches = self.topic_index.search(self.search_var.get(), fuzzy=FUZZY_SEARCH)
+        shown = [topic for topic in self.topic_list.topics if topic in matches]
+        # Typing that doesn't change the result leaves the list alone
+        if shown != self.topic_list.shown:
+            self.topic_list.show(shown)
 
     def update_topics(self):
-        data = self.tracker.load_data()
-        topics = set(d['topic'] for d in data)
-        
         # Sort topics by score
-        topic_scores = [(topic, self.tracker.calculate_knowledge(topic)) for topic in topics]
-        topics = [topic for topic, _ in sorted(topic_scores, key=lambda x: x[1])]
+        topic_scores = self.tracker.calculate_all_knowledge()
+        topics = sorted(topic_scores, key=topic_scores.get)
         
-        # Clear existing topic frames
-        for widget in self.topics_frame.winfo_children():
-            widget.destroy()
-        
-        # Create frames for each topic
-        for topic in topics:
-            frame = tk.LabelFrame(self.topics_frame, text=topic)
-            frame.pack(pady=5, padx=5, fill="x")
-            
-            # Score label
-            score = self.tracker.calculate_knowledge(topic)
-            score_label = tk.Label(frame, text=f"Score: {score:.2f}")
-            score_label.pack()
-            self.create_buttons(frame, topic, score_label)
+        self.topic_list.set_topics(topics, {topic: f"Score: {score:.2f}" for topic, score in topic_scores.items()})
+        if set(topics) != set(self.topic_index.topics):
+            self.topic_index = TopicIndex(topics)
+        self.filter_topics()
 
+    def record_attempt(self, topic, difficulty, correct):
+        self.save_attempt(topic, difficulty, correct)
 
-    def create_buttons(self, frame, topic, score_label):
-        difficulties = [('e', 'green'), ('m', 'orange'), ('h', 'red')]
-        button_frame = tk.Frame(frame)
-        button_frame.pack(pady=5)
-        
-        for diff, color in difficulties:
-            wrong_btn = tk.Button(button_frame, text=f"{diff.title()} -", 
-                                bg=color, 
-                                command=lambda t=topic, d=diff, s=score_label: 
-                                self.record_attempt(t, d, False, s))
-            wrong_btn.pack(side=tk.LEFT, padx=5)
-            
-            right_btn = tk.Button(button_frame, text=f"{diff.title()} +", 
-                                bg=color, 
-                                command=lambda t=topic, d=diff, s=score_label: 
-                                self.record_attempt(t, d, True, s))
-            right_btn.pack(side=tk.LEFT, padx=5)
-        
-        def show_difficulty_menu(topic):
-            menu = tk.Menu(self.root, tearoff=0)
-            for diff, _ in difficulties:
-                menu.add_command(label=diff.title(), 
-                            command=lambda t=topic, d=diff: self.create_practice_window(t, d))
-            menu.post(button_frame.winfo_pointerx(), button_frame.winfo_pointery())
-        
-        practice_btn = tk.Button(button_frame, text="Practice", 
-                            command=lambda t=topic: show_difficulty_menu(t))
-        practice_btn.pack(side=tk.LEFT, padx=5)
-
-    def record_attempt(self, topic, difficulty, correct, score_label):
-        data = self.tracker.load_data()
-        
-        new_attempt = {
-            'topic': topic,
-            'difficulty': difficulty,
-            'correct': str(correct),
-            'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        data.append(new_attempt)
-        
-        with open(self.tracker.filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['topic', 'difficulty', 'correct', 'date'])
-            writer.writeheader()
-            writer.writerows(data)
-
-        # Update the score display with timestamp
+        # Update the score display with timestamp, only this topic's row changes
         score = self.tracker.calculate_knowledge(topic)
         current_time = datetime.now().strftime('%H:%M:%S')
-        score_label.config(text=f"Score: {score:.2f} (Updated at {current_time})")
-        
-        # Flash the score label briefly to indicate update
-        original_bg = score_label.cget("background")
-        score_label.config(background="yellow")
-        self.root.after(500, lambda: score_label.config(background=original_bg))
+        row = self.topic_list.set_score_text(topic, f"Score: {score:.2f} (Updated at {current_time})")
+        if row is not None:
+            row.flash()
         
     def change_text_size(self, delta, question_label, choice_radios):
         """
@@ -219,14 +166,28 @@ class SkillTrackerGUI:
         practice_window.bind('<Command-equal>', lambda e: self.change_text_size(1, question_label, choice_radios))
         practice_window.bind('<Control-equal>', lambda e: self.change_text_size(1, question_label, choice_radios))
         
-        # Handle window close button (X)
-        def on_closing():
+        # Questions drawn ahead of time, already shuffled, so Next Question shows one at once
+        prefetched = deque()
+        
+        def close_window():
+            # Give the prefetched questions and an unanswered current one back to the pool
+            current = getattr(check_answer, 'current_question', None)
+            for question_data, _ in list(prefetched) + ([current] if current else []):
+                self.question_manager.release_question(question_data['id'])
+            prefetched.clear()
             practice_window.destroy()
             self.root.deiconify()  # Show main window again
+        
+        # Handle window close button (X)
+        def on_closing():
+            close_window()
             self.update_topics()
         practice_window.protocol("WM_DELETE_WINDOW", on_closing)
         
-        self.question_manager = QuestionManager(questions_file=QUESTIONS_FILENAME)
+        # Pick up questions added by claude_gen since the last practice session,
+        # once the used ids still being written are on disk
+        self.writer.flush()
+        self.question_manager.refresh()
         
         # Create widgets
         question_frame = tk.Frame(practice_window)
@@ -290,17 +251,11 @@ class SkillTrackerGUI:
             self.timer_running = False
             self.timer_label.config(text="Time: 0:00")
 
-        def load_new_question():
-            question_data = self.question_manager.get_question(topic, difficulty)
-            
+        def prepare_question():
+            """Reserve a question and shuffle its choices, without showing it yet"""
+            question_data = self.question_manager.reserve_question(topic, difficulty)
             if not question_data:
-                tk.messagebox.showinfo("No Questions", 
-                                    "No more questions available for this topic and difficulty!")
-                practice_window.destroy()
-                self.root.deiconify()  # Show main window again
                 return None
-                
-            question_label.config(text=question_data['question'])
             
             # Create a list of tuples containing (choice, is_correct)
             choices_with_answers = list(enumerate(question_data['choices']))
@@ -312,14 +267,9 @@ class SkillTrackerGUI:
             new_correct_index = next(i for i, (old_index, _) in enumerate(choices_with_answers) 
                                 if old_index == question_data['correct_answer'])
             
-            # Update the choices in the GUI
-            for i, (_, choice) in enumerate(choices_with_answers):
-                choice_radios[i].config(text=choice)
-            
-            choice_var.set(-1)
-            
             # Create a new question_data with updated correct_answer
             shuffled_question_data = {
+                'id': question_data['id'],
                 'question': question_data['question'],
                 'choices': [choice for _, choice in choices_with_answers],
                 'correct_answer': new_correct_index,
@@ -328,6 +278,37 @@ class SkillTrackerGUI:
             
             return (shuffled_question_data, difficulty)
         
+        def prefetch_questions():
+            """Prepare one more question whenever the window is idle, until PREFETCH_QUESTIONS are ready"""
+            if not practice_window.winfo_exists() or len(prefetched) >= PREFETCH_QUESTIONS:
+                return
+            prepared = prepare_question()
+            if prepared is not None:
+                prefetched.append(prepared)
+                practice_window.after_idle(prefetch_questions)
+        
+        def load_new_question():
+            current = prefetched.popleft() if prefetched else prepare_question()
+            
+            if not current:
+                tk.messagebox.showinfo("No Questions", 
+                                    "No more questions available for this topic and difficulty!")
+                close_window()
+                return None
+            
+            question_data, _ = current
+            question_label.config(text=question_data['question'])
+            
+            # Update the choices in the GUI
+            for i, choice in enumerate(question_data['choices']):
+                choice_radios[i].config(text=choice)
+            
+            choice_var.set(-1)
+            
+            # Get the following questions ready while this one is being answered
+            practice_window.after_idle(prefetch_questions)
+            return current
+        
         def check_answer():
             if not hasattr(check_answer, 'current_question') or check_answer.current_question is None:
                 return
@@ -342,9 +323,10 @@ class SkillTrackerGUI:
             
                     
             correct = selected == question_data['correct_answer']
-            self.tracker.save_attempt(topic, current_diff, str(correct))
+            self.save_attempt(topic, current_diff, correct)
             
-            self.question_manager.mark_question_as_used(topic, current_diff, question_data['question'])
+            self.question_manager.mark_question_as_used(question_data['id'], save=False)
+            self.writer.submit(self.question_manager.append_used_ids, [question_data['id']], self.on_write_done)
             
             # Update result label instead of showing popup
             if correct:
@@ -410,11 +392,7 @@ class SkillTrackerGUI:
         next_button.pack(side=tk.LEFT, padx=10)
 
         # Add return button
-        def return_to_main():
-            practice_window.destroy()
-            self.root.deiconify()  # Show main window again
-            
-        return_button = tk.Button(button_frame, text="Return to Topics", command=return_to_main)
+        return_button = tk.Button(button_frame, text="Return to Topics", command=close_window)
         return_button.pack(side=tk.LEFT, padx=10)
         
         result_label = tk.Label(button_frame, text="", font=('TkDefaultFont', self.current_text_size))